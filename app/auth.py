@@ -3,14 +3,15 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 import jwt
 from fastapi import Depends, HTTPException, status
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.status import HTTP_401_UNAUTHORIZED
 
 from app.schemas import User as UserSchema
 from app.db_depends import get_async_db
 from app.models.users import User as UserModel
-from app.config import get_secret_key, ALGORITHM
+from app.config import SIGNING_KEY, SIGNING_KEY_ID, ALGORITHM
+from app.jwt_cache import jwt_cache
+from app.statements import active_user_by_email_stmt
 
 pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
@@ -45,7 +46,7 @@ def create_jwt(token_data: dict, token_type: str):
         "exp": issued_at + expire_timedelta,
         "token_type": token_type
     })
-    return jwt.encode(to_encode, get_secret_key(), algorithm=ALGORITHM)
+    return jwt.encode(to_encode, SIGNING_KEY, algorithm=ALGORITHM, headers={'kid': SIGNING_KEY_ID})
 
 
 def create_access_token(user: UserSchema):
@@ -69,7 +70,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
         headers={"WWW-Authenticate": "Bearer"}
     )
     try:
-        payload = jwt.decode(token, get_secret_key(), algorithms=[ALGORITHM])
+        payload = jwt_cache.decode(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -81,9 +82,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
         )
     except jwt.PyJWTError:
         raise credentials_exception
-    user_stmt = select(UserModel).where(UserModel.email == email,
-                                        UserModel.is_active == True)
-    result = await db.scalars(user_stmt)
+    result = await db.scalars(active_user_by_email_stmt, {'email': email})
     db_user = result.first()
     if db_user is None:
         raise credentials_exception
@@ -0,0 +1,240 @@
+import asyncio
+import heapq
+import logging
+import sys
+from bisect import bisect_left
+
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.models import Product as ProductModel, Category as CategoryModel
+from app.notifications import add_notification_handler, RESET_PAYLOAD
+from app.product_cache import PRODUCT_CACHE_CHANNEL
+from app.routers.operations.categories_operations import CATEGORIES_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_MAX_ENTRIES = 1_000_000  # memory bound: about 100 MB
+AUTOCOMPLETE_MAX_WORDS = 5  # name is found by prefix of any of its first words
+AUTOCOMPLETE_MAX_SCAN = 20_000  # ranking of very short prefixes looks at first matches only
+AUTOCOMPLETE_RETRY_DELAY_SECONDS = 5
+# sorts after any character of names: prefix + this is the upper bound of prefix range
+_MAX_CHAR = '\U0010ffff'
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.casefold().split())
+
+
+def get_index_keys(name: str) -> list[str]:
+    """Keys of name: normalized name from each of its first words"""
+    words = normalize(name).split(' ')
+    return [' '.join(words[i:]) for i in range(min(len(words), AUTOCOMPLETE_MAX_WORDS)) if words[i]]
+
+
+class AutocompleteIndex:
+    """Sorted array of name keys with binary search of prefix range.
+
+    Products are stored with positive refs (product id), categories with negative (-category id).
+    """
+
+    def __init__(self, max_entries: int = AUTOCOMPLETE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._keys: list[str] = []
+        self._refs: list[int] = []
+        self._names: dict[int, str] = {}
+        self._ratings: dict[int, float] = {}
+        self._keys_bytes = 0
+        self.skipped = 0  # names not indexed because of max_entries
+
+    def search(self, prefix: str, limit: int) -> list[dict]:
+        """Get categories and then products by best rating which names have a word starting with prefix"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        start = bisect_left(self._keys, prefix)
+        end = min(bisect_left(self._keys, prefix + _MAX_CHAR, lo=start), start + AUTOCOMPLETE_MAX_SCAN)
+        refs = set(self._refs[start:end])
+
+        category_ids = sorted((-ref for ref in refs if ref < 0), key=lambda ref: self._names[-ref])
+        suggestions = [{'type': 'category', 'id': category_id, 'name': self._names[-category_id]}
+                       for category_id in category_ids[:limit]]
+        product_ids = heapq.nlargest(limit - len(suggestions), (ref for ref in refs if ref > 0),
+                                     key=lambda ref: (self._ratings[ref], -len(self._names[ref])))
+        suggestions.extend({'type': 'product', 'id': product_id, 'name': self._names[product_id],
+                            'rating': self._ratings[product_id]}
+                           for product_id in product_ids)
+        return suggestions
+
+    def set_product(self, product_id: int, name: str, rating: float) -> None:
+        self._set(product_id, name)
+        if product_id in self._names:
+            self._ratings[product_id] = rating
+
+    def remove_product(self, product_id: int) -> None:
+        self._remove(product_id)
+        self._ratings.pop(product_id, None)
+
+    def set_category(self, category_id: int, name: str) -> None:
+        self._set(-category_id, name)
+
+    def remove_category(self, category_id: int) -> None:
+        self._remove(-category_id)
+
+    def load(self, categories: list[tuple[int, str]], products: list[tuple[int, str, float]]) -> None:
+        """Replace index content by one sort (products ordered by rating: the best are kept if index is full)"""
+        names: dict[int, str] = {}
+        ratings: dict[int, float] = {}
+        entries: list[tuple[str, int]] = []
+        skipped = 0
+        items = [(-category_id, name, None) for category_id, name in categories]
+        items += [(product_id, name, rating) for product_id, name, rating in products]
+        for ref, name, rating in items:
+            keys = get_index_keys(name)
+            if len(entries) + len(keys) > self.max_entries:
+                skipped += 1
+                continue
+            names[ref] = name
+            if rating is not None:
+                ratings[ref] = rating
+            entries.extend((key, ref) for key in keys)
+        entries.sort()
+        self._keys = [key for key, _ in entries]
+        self._refs = [ref for _, ref in entries]
+        self._names, self._ratings = names, ratings
+        self._keys_bytes = sum(sys.getsizeof(key) for key in self._keys)
+        self.skipped = skipped
+
+    def get_category_ids(self) -> list[int]:
+        return [-ref for ref in self._names if ref < 0]
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._keys),
+            'max_entries': self.max_entries,
+            'products': len(self._ratings),
+            'categories': len(self._names) - len(self._ratings),
+            'skipped': self.skipped,
+            'memory_bytes': self.memory_bytes(),
+        }
+
+    def memory_bytes(self) -> int:
+        """Approximate memory of index: keys, arrays of pointers and names dicts"""
+        pointer_size = 8
+        names_bytes = len(self._names) * (sys.getsizeof(0) + 2 * pointer_size + 64)
+        return self._keys_bytes + 2 * pointer_size * len(self._keys) + names_bytes
+
+    def _set(self, ref: int, name: str) -> None:
+        if self._names.get(ref) == name:
+            return
+        self._remove(ref)
+        keys = get_index_keys(name)
+        if len(self._keys) + len(keys) > self.max_entries:
+            self._ratings.pop(ref, None)  # product is not indexed anymore, neither is its rating
+            self.skipped += 1
+            return
+        self._names[ref] = name
+        for key in keys:
+            position = bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._refs.insert(position, ref)
+            self._keys_bytes += sys.getsizeof(key)
+
+    def _remove(self, ref: int) -> None:
+        name = self._names.pop(ref, None)
+        if name is None:
+            return
+        for key in get_index_keys(name):
+            position = bisect_left(self._keys, key)
+            while self._refs[position] != ref:
+                position += 1
+            del self._keys[position]
+            del self._refs[position]
+            self._keys_bytes -= sys.getsizeof(key)
+
+
+class AutocompleteUpdater:
+    """Keeps index in sync with db by notifications of product and category writes from all workers
+
+    Index is built when notifications listener connects: it sends reset to handlers then.
+    """
+
+    def __init__(self, index: AutocompleteIndex):
+        self.index = index
+        self._dirty_product_ids: set[int] = set()
+        self._rebuild_requested = False
+        self._reload_categories_requested = False
+        self._changed = asyncio.Event()
+
+    def request_rebuild(self) -> None:
+        self._rebuild_requested = True
+        self._changed.set()
+
+    def handle_product_notification(self, payload: str) -> None:
+        product_id = payload.partition(':')[0]
+        if product_id == RESET_PAYLOAD:
+            self.request_rebuild()  # after listener (re)connect and category subtree changes
+            return
+        self._dirty_product_ids.add(int(product_id))
+        self._changed.set()
+
+    def handle_categories_notification(self, payload: str) -> None:
+        self._reload_categories_requested = True
+        self._changed.set()
+
+    async def run(self) -> None:
+        """Build index, then apply changes in batches"""
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            try:
+                if self._rebuild_requested:
+                    self._rebuild_requested = self._reload_categories_requested = False
+                    self._dirty_product_ids.clear()
+                    await self.rebuild()
+                    continue
+                if self._reload_categories_requested:
+                    self._reload_categories_requested = False
+                    await self.reload_categories()
+                if self._dirty_product_ids:
+                    product_ids, self._dirty_product_ids = self._dirty_product_ids, set()
+                    await self.reload_products(product_ids)
+            except Exception:
+                logger.exception("Autocomplete index update failed, rebuilding it")
+                await asyncio.sleep(AUTOCOMPLETE_RETRY_DELAY_SECONDS)
+                self.request_rebuild()
+
+    async def rebuild(self) -> None:
+        async with async_session_maker() as db:
+            products = (await db.execute(select(ProductModel.id, ProductModel.name, ProductModel.rating)
+                                         .where(ProductModel.is_visible == True)
+                                         .order_by(ProductModel.rating.desc()))).all()
+            categories = (await db.execute(select(CategoryModel.id, CategoryModel.name)
+                                           .where(CategoryModel.is_active == True))).all()
+        self.index.load(categories, [(product_id, name, float(rating)) for product_id, name, rating in products])
+
+    async def reload_categories(self) -> None:
+        async with async_session_maker() as db:
+            categories = dict((await db.execute(select(CategoryModel.id, CategoryModel.name)
+                                                .where(CategoryModel.is_active == True))).all())
+        for category_id in self.index.get_category_ids():
+            if category_id not in categories:
+                self.index.remove_category(category_id)
+        for category_id, name in categories.items():
+            self.index.set_category(category_id, name)
+
+    async def reload_products(self, product_ids: set[int]) -> None:
+        async with async_session_maker() as db:
+            products = (await db.execute(select(ProductModel.id, ProductModel.name, ProductModel.rating)
+                                         .where(ProductModel.id.in_(product_ids),
+                                                ProductModel.is_visible == True))).all()
+        for product_id, name, rating in products:
+            self.index.set_product(product_id, name, float(rating))
+        for product_id in product_ids - {product_id for product_id, _, _ in products}:
+            self.index.remove_product(product_id)
+
+
+autocomplete_index = AutocompleteIndex()
+autocomplete_updater = AutocompleteUpdater(autocomplete_index)
+add_notification_handler(PRODUCT_CACHE_CHANNEL, autocomplete_updater.handle_product_notification)
+add_notification_handler(CATEGORIES_CHANNEL, autocomplete_updater.handle_categories_notification)
@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MINIMUM_SIZE = 1000
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/html', 'text/css', 'application/javascript')
+# GET endpoints which payload changes only on writes: compressed bytes are reused while body is the same
+PRECOMPRESSED_PATHS = frozenset({'/products/', '/categories/', '/categories/tree', '/reviews'})
+PRECOMPRESSED_CACHE_SIZE = 64
+
+# Cheap levels for one-off bodies, strong levels for bodies compressed once and reused
+GZIP_LEVEL, GZIP_CACHED_LEVEL = 6, 9
+BROTLI_QUALITY, BROTLI_CACHED_QUALITY = 4, 9
+
+
+def get_accepted_encoding(accept_encoding: str) -> str | None:
+    """Choose 'br' or 'gzip' from Accept-Encoding header (None if client accepts neither)"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def compress_body(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_CACHED_QUALITY if cached else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_CACHED_LEVEL if cached else GZIP_LEVEL, mtime=0)
+
+
+class PrecompressedCache:
+    """LRU of compressed bodies keyed by encoding and digest of uncompressed body"""
+
+    def __init__(self, max_size: int = PRECOMPRESSED_CACHE_SIZE):
+        self.max_size = max_size
+        self._bodies: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compress(self, body: bytes, encoding: str) -> bytes:
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self._bodies.get(key)
+        if compressed is not None:
+            self._bodies.move_to_end(key)
+            self.hits += 1
+            return compressed
+
+        self.misses += 1
+        compressed = compress_body(body, encoding, cached=True)
+        self._bodies[key] = compressed
+        if len(self._bodies) > self.max_size:
+            self._bodies.popitem(last=False)
+        return compressed
+
+    def stats(self) -> dict:
+        return {'size': len(self._bodies), 'hits': self.hits, 'misses': self.misses}
+
+
+precompressed_cache = PrecompressedCache()
+
+
+class CompressionMiddleware:
+    """Compress responses bigger than minimum_size with brotli or gzip"""
+
+    def __init__(self, app: ASGIApp,
+                 minimum_size: int = MINIMUM_SIZE,
+                 precompressed_paths: frozenset[str] = PRECOMPRESSED_PATHS,
+                 cache: PrecompressedCache = precompressed_cache):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.precompressed_paths = precompressed_paths
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = get_accepted_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        use_cache = scope['method'] == 'GET' and scope['path'] in self.precompressed_paths
+        responder = _CompressionResponder(send, encoding, self.minimum_size,
+                                          self.cache if use_cache else None)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Buffer compressible response body and send it compressed, pass other responses through"""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int, cache: PrecompressedCache | None):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.cache = cache
+        self.start_message: Message | None = None
+        self.passthrough = False
+        self.body_parts: list[bytes] = []
+
+    async def send(self, message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            headers = Headers(raw=message['headers'])
+            content_type = headers.get('content-type', '')
+            # never buffer streams (e.g. text/event-stream) and already encoded bodies
+            self.passthrough = ('content-encoding' in headers
+                                or not content_type.startswith(COMPRESSIBLE_TYPES))
+            if self.passthrough:
+                await self._send(message)
+            else:
+                self.start_message = message
+            return
+
+        if self.passthrough or message['type'] != 'http.response.body':
+            await self._send(message)
+            return
+
+        self.body_parts.append(message.get('body', b''))
+        if message.get('more_body', False):
+            return
+
+        body = b''.join(self.body_parts)
+        headers = MutableHeaders(raw=self.start_message['headers'])
+        if len(body) >= self.minimum_size:
+            body = (self.cache.get_or_compress(body, self.encoding) if self.cache is not None
+                    else compress_body(body, self.encoding))
+            headers['Content-Encoding'] = self.encoding
+            headers['Content-Length'] = str(len(body))
+        headers.add_vary_header('Accept-Encoding')
+        await self._send(self.start_message)
+        await self._send({'type': 'http.response.body', 'body': body})
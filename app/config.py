@@ -12,15 +12,20 @@ class ConfigBase(BaseSettings):
 
 class SecretKeyConfig(ConfigBase):
     KEY: SecretStr
+    KEY_ID: str = 'default'  # 'kid' header of new tokens
+    # rotated out keys by their kid, tokens signed by them are valid until they expire
+    # (json in env: SECRET_PREVIOUS_KEYS='{"2025-01": "..."}')
+    PREVIOUS_KEYS: dict[str, SecretStr] = {}
     model_config = SettingsConfigDict(env_prefix="SECRET_")
 
 
 key_cfg = SecretKeyConfig()
 ALGORITHM = "HS256"
 
-
-def get_secret_key() -> str:
-    return key_cfg.KEY.get_secret_value()
-
-
-
+# resolved once: SecretStr is not unwrapped per request
+SIGNING_KEY_ID = key_cfg.KEY_ID
+SIGNING_KEY = key_cfg.KEY.get_secret_value()
+VERIFICATION_KEYS: dict[str, str] = {
+    **{key_id: key.get_secret_value() for key_id, key in key_cfg.PREVIOUS_KEYS.items()},
+    SIGNING_KEY_ID: SIGNING_KEY,
+}
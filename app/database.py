@@ -1,14 +1,21 @@
 from pydantic import SecretStr
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from pydantic_settings import SettingsConfigDict
 
 from app.config import ConfigBase
+from app.limiter import limiter_cfg
 
 
 class DatabaseConfig(ConfigBase):
     URL: SecretStr
+    ECHO: bool = False  # log every statement (use SLOW_QUERY_ settings to see slow ones only)
+    # server-side prepared statements kept per asyncpg connection (0 behind pgbouncer in transaction mode)
+    PREPARED_STATEMENT_CACHE_SIZE: int = 500
+    # pool size beyond limiter slots: LISTEN connection, idempotency middleware (outside limiter), background jobs
+    RESERVED_CONNECTIONS: int = 5
+    MAX_OVERFLOW: int = 5  # bursts of idempotency claims and background jobs
     model_config = SettingsConfigDict(env_prefix='DATABASE_')
 
 
@@ -16,8 +23,15 @@ class DatabaseConfig(ConfigBase):
 db_cfg = DatabaseConfig()
 DATABASE_URL = db_cfg.URL.get_secret_value()
 
+connect_args = {}
+if make_url(DATABASE_URL).get_driver_name() == 'asyncpg':
+    connect_args['prepared_statement_cache_size'] = db_cfg.PREPARED_STATEMENT_CACHE_SIZE
+
 async_engine = create_async_engine(DATABASE_URL,
-                                   echo=True)
+                                   echo=db_cfg.ECHO,
+                                   pool_size=limiter_cfg.total_limit + db_cfg.RESERVED_CONNECTIONS,
+                                   max_overflow=db_cfg.MAX_OVERFLOW,
+                                   connect_args=connect_args)
 
 async_session_maker = async_sessionmaker(async_engine,
                                          expire_on_commit=False,
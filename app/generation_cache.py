@@ -0,0 +1,46 @@
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
+
+class GenerationCache:
+    """In-process LRU of serialized values dropped on writes notified by any worker
+
+    Every invalidation bumps the generation: a value read from db before a write is not
+    cached after the write dropped the cache (set() gets the generation the read started at).
+    Entries expire after TTL as a safety net if a notification is lost.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self._values: OrderedDict[Hashable, tuple[bytes, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, key: Hashable) -> bytes | None:
+        value = self._values.get(key)
+        if value is None or value[1] < time.monotonic():
+            return None
+        self._values.move_to_end(key)
+        return value[0]
+
+    def set(self, key: Hashable, value: bytes, generation: int) -> bool:
+        """Cache value read when cache generation was `generation` (False if invalidated since)"""
+        if generation != self.generation:
+            return False
+        self._values[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._values.move_to_end(key)
+        if len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        self.generation += 1
+        self._values.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._values.clear()
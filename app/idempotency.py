@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import async_session_maker
+from app.models import IdempotencyKey as IdempotencyKeyModel
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'idempotency-key'
+IDEMPOTENT_PATHS = frozenset({'/products/', '/reviews', '/users/'})
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_KEY_TTL_HOURS = 24  # of saved responses
+IN_PROGRESS_LEASE_SECONDS = 60  # in-progress record of a crashed worker is taken over after it
+IN_PROGRESS_WAIT_SECONDS = 10
+SWEEP_INTERVAL_MINUTES = 10
+
+
+def get_record_key(method: str, path: str, authorization: str, idempotency_key: str) -> str:
+    """Digest of key: the same key of different users or endpoints never collides"""
+    return hashlib.sha256('\n'.join((method, path, authorization, idempotency_key)).encode()).hexdigest()
+
+
+async def claim_idempotency_key(key: str, request_hash: str) -> datetime | None:
+    """Insert in-progress record leased for key (or take over expired one).
+
+    Returns its created_at identifying the claim, None if key is already taken.
+    """
+    now = datetime.now()
+    values = dict(key=key, request_hash=request_hash, status_code=None, response_headers=None,
+                  response_body=None, created_at=now,
+                  expires_at=now + timedelta(seconds=IN_PROGRESS_LEASE_SECONDS))
+    claim_stmt = insert(IdempotencyKeyModel).values(**values)
+    claim_stmt = claim_stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKeyModel.key],
+        set_={column: value for column, value in values.items() if column != 'key'},
+        where=IdempotencyKeyModel.expires_at < now
+    ).returning(IdempotencyKeyModel.key)
+    async with async_session_maker() as db:
+        claimed = (await db.execute(claim_stmt)).first() is not None
+        await db.commit()
+    return now if claimed else None
+
+
+async def get_idempotency_record(key: str) -> IdempotencyKeyModel | None:
+    async with async_session_maker() as db:
+        return await db.get(IdempotencyKeyModel, key)
+
+
+def owned_record(key: str, claimed_at: datetime):
+    """Condition of in-progress record of this claim (not of another one after lease expired)"""
+    return ((IdempotencyKeyModel.key == key) & (IdempotencyKeyModel.created_at == claimed_at)
+            & IdempotencyKeyModel.status_code.is_(None))
+
+
+async def save_idempotency_response(key: str, claimed_at: datetime, status_code: int, headers: list,
+                                    body: bytes) -> None:
+    """Save response and keep it for the full TTL"""
+    async with async_session_maker() as db:
+        await db.execute(update(IdempotencyKeyModel)
+                         .where(owned_record(key, claimed_at))
+                         .values(status_code=status_code, response_headers=headers, response_body=body,
+                                 expires_at=datetime.now() + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS))
+                         )
+        await db.commit()
+
+
+async def release_idempotency_key(key: str, claimed_at: datetime) -> None:
+    """Delete in-progress record, so retry of failed request runs again"""
+    async with async_session_maker() as db:
+        await db.execute(delete(IdempotencyKeyModel).where(owned_record(key, claimed_at)))
+        await db.commit()
+
+
+async def run_idempotency_keys_sweep() -> None:
+    """Delete expired idempotency keys periodically"""
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL_MINUTES * 60)
+        try:
+            async with async_session_maker() as db:
+                await db.execute(delete(IdempotencyKeyModel)
+                                 .where(IdempotencyKeyModel.expires_at < datetime.now())
+                                 )
+                await db.commit()
+        except Exception:
+            logger.exception("Idempotency keys sweep failed")
+
+
+class IdempotencyMiddleware:
+    """Run POST with Idempotency-Key header once and replay its first response to duplicates"""
+
+    def __init__(self, app: ASGIApp, paths: frozenset[str] = IDEMPOTENT_PATHS):
+        self.app = app
+        self.paths = paths
+        # keys handled by this worker right now: duplicates wait on the event instead of polling db
+        self._in_flight: dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] != 'POST' or scope['path'] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            response = JSONResponse({'detail': 'Invalid Idempotency-Key header'}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        key = get_record_key(scope['method'], scope['path'], headers.get('authorization', ''), idempotency_key)
+        request_hash = hashlib.sha256(body).hexdigest()
+
+        response = await self._get_replay_response(key, request_hash)
+        if isinstance(response, datetime):
+            await self._run_once(key, response, body, scope, receive, send)
+            return
+        await response(scope, receive, send)
+
+    async def _get_replay_response(self, key: str, request_hash: str) -> Response | datetime:
+        """Wait for in-flight duplicate and get its response (claim time if this request has to run)"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + IN_PROGRESS_WAIT_SECONDS
+        poll_delay = 0.05
+        while True:
+            event = self._in_flight.get(key)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    return self._in_progress_response()
+            elif (claimed_at := await claim_idempotency_key(key, request_hash)) is not None:
+                return claimed_at
+
+            record = await get_idempotency_record(key)
+            if record is None:
+                continue  # first request failed and released the key, run this one
+            if record.status_code is None and record.expires_at < datetime.now():
+                continue  # lease of crashed request expired, take it over
+            if record.request_hash != request_hash:
+                return JSONResponse({'detail': 'Idempotency-Key was used with another request body'},
+                                    status_code=422)
+            if record.status_code is not None:
+                response = Response(content=record.response_body, status_code=record.status_code)
+                response.raw_headers = [(name.encode('latin-1'), value.encode('latin-1'))
+                                        for name, value in record.response_headers]
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            # in progress on another worker
+            if loop.time() + poll_delay > deadline:
+                return self._in_progress_response()
+            await asyncio.sleep(poll_delay)
+            poll_delay = min(poll_delay * 2, 1.0)
+
+    async def _run_once(self, key: str, claimed_at: datetime, body: bytes,
+                        scope: Scope, receive: Receive, send: Send) -> None:
+        """Run request and save its response (release key if it failed with 5xx)"""
+        event = self._in_flight[key] = asyncio.Event()
+        start_message: Message | None = None
+        body_parts: list[bytes] = []
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def capture_send(message: Message) -> None:
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                start_message = message
+            elif message['type'] == 'http.response.body':
+                body_parts.append(message.get('body', b''))
+            await send(message)
+
+        saved = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if start_message is not None and start_message['status'] < 500:
+                headers = [[name.decode('latin-1'), value.decode('latin-1')]
+                           for name, value in start_message['headers']]
+                await save_idempotency_response(key, claimed_at, start_message['status'], headers,
+                                                b''.join(body_parts))
+                saved = True
+        finally:
+            try:
+                if not saved:
+                    await release_idempotency_key(key, claimed_at)
+            finally:
+                del self._in_flight[key]
+                event.set()
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        body_parts = []
+        while True:
+            message = await receive()
+            body_parts.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(body_parts)
+
+    @staticmethod
+    def _in_progress_response() -> Response:
+        return JSONResponse({'detail': 'Request with this Idempotency-Key is still in progress'},
+                            status_code=409, headers={'Retry-After': '1'})
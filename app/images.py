@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Protocol
+
+from fastapi import HTTPException, status
+from PIL import Image, ImageOps
+from pydantic_settings import SettingsConfigDict
+
+from app.config import ConfigBase
+
+IMAGES_URL_PREFIX = '/images'
+THUMBNAIL_SIZES = (160, 480, 1024)  # max side of thumbnails in px
+WEBP_QUALITY, JPEG_QUALITY = 80, 85
+# content digest of original and variant file name: the only names served from storage
+IMAGE_DIGEST_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+IMAGE_NAME_PATTERN = re.compile(r'^(original\.(jpeg|png|webp)|\d+\.(webp|jpeg))$')
+IMAGE_MEDIA_TYPES = {'jpeg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+# variants are never changed under the same url
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class ImagesConfig(ConfigBase):
+    STORAGE_DIR: str = 'media/images'
+    WORKERS: int = 2  # processes for decoding and resizing, apart from API workers
+    MAX_PENDING: int = 8  # uploads processed or waiting for a process, more are answered 503
+    MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    MULTIPART_OVERHEAD_BYTES: int = 64 * 1024  # boundaries and part headers around image in request body
+    MAX_PIXELS: int = 40_000_000  # decompression bomb guard
+    model_config = SettingsConfigDict(env_prefix='IMAGES_')
+
+
+images_cfg = ImagesConfig()
+
+
+def process_image(data: bytes, max_pixels: int) -> tuple[str, dict[str, bytes]]:
+    """Decode image and make thumbnails (runs in worker process): (original format, {name: bytes})"""
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format = (image.format or '').lower()
+            if image_format not in IMAGE_MEDIA_TYPES:
+                raise ValueError(f'Unsupported image format {image.format}')
+            # size is known from header: Pillow itself raises only above twice MAX_IMAGE_PIXELS
+            if image.width * image.height > max_pixels:
+                raise ValueError(f'Image must be at most {max_pixels} pixels')
+            image.load()
+            image = ImageOps.exif_transpose(image)
+    except (OSError, Image.DecompressionBombError) as error:
+        raise ValueError('File is not a valid image') from error
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    variants = {}
+    for size in THUMBNAIL_SIZES:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS)
+        webp = io.BytesIO()
+        thumbnail.save(webp, 'WEBP', quality=WEBP_QUALITY, method=4)
+        variants[f'{size}.webp'] = webp.getvalue()
+        jpeg = io.BytesIO()
+        # JPEG fallback for clients without WebP, transparency is put on white
+        if has_alpha:
+            background = Image.new('RGB', thumbnail.size, 'white')
+            background.paste(thumbnail, mask=thumbnail.getchannel('A'))
+            thumbnail = background
+        thumbnail.save(jpeg, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        variants[f'{size}.jpeg'] = jpeg.getvalue()
+    return image_format, variants
+
+
+class ImageStorage(Protocol):
+    """Storage of image files (object storage in production)"""
+
+    def save(self, key: str, data: bytes) -> None: ...
+
+    def get_path(self, key: str) -> str | None: ...
+
+
+class LocalImageStorage:
+    """Filesystem stand-in of object storage"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def save(self, key: str, data: bytes) -> None:
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)  # readers never see partial file
+
+    def get_path(self, key: str) -> str | None:
+        path = os.path.join(self.directory, key)
+        return path if os.path.isfile(path) else None
+
+
+class ImageProcessor:
+    """Bounded process pool for image CPU work, keeps event loop of API worker free"""
+
+    def __init__(self, storage: ImageStorage, workers: int, max_pending: int):
+        self.storage = storage
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def ingest(self, data: bytes) -> dict:
+        """Store original with its thumbnails under content digest and get their urls"""
+        if self.pending >= self.max_pending:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail='Too many images are processed, retry later',
+                                headers={'Retry-After': '1'})
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        self.pending += 1
+        try:
+            image_format, variants = await asyncio.get_running_loop().run_in_executor(
+                self._pool, process_image, data, images_cfg.MAX_PIXELS)
+        except ValueError as error:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+        finally:
+            self.pending -= 1
+
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        variants[f'original.{image_format}'] = data
+        await asyncio.to_thread(self._save_all, digest, variants)
+        return {
+            'original': get_image_url(digest, f'original.{image_format}'),
+            'thumbnails': {size: {image_type: get_image_url(digest, f'{size}.{image_type}')
+                                  for image_type in ('webp', 'jpeg')}
+                           for size in THUMBNAIL_SIZES},
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _save_all(self, digest: str, variants: dict[str, bytes]) -> None:
+        for name, data in variants.items():
+            self.storage.save(f'{digest}/{name}', data)
+
+
+def get_image_url(digest: str, name: str) -> str:
+    return f'{IMAGES_URL_PREFIX}/{digest}/{name}'
+
+
+image_processor = ImageProcessor(LocalImageStorage(images_cfg.STORAGE_DIR),
+                                 workers=images_cfg.WORKERS,
+                                 max_pending=images_cfg.MAX_PENDING)
@@ -0,0 +1,69 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+import jwt
+
+from app.config import ALGORITHM, SIGNING_KEY, VERIFICATION_KEYS
+
+JWT_CACHE_SIZE = 10_000  # tokens of recently active sessions per worker
+
+
+class JWTDecodeCache:
+    """LRU of verified token claims, a session's token is decoded once instead of per request
+
+    Keyed by token digest (tokens are not kept in memory), entry expires at token 'exp'
+    or once the key that verified it is rotated out. Invalid tokens are not cached.
+    Claims are shared between requests and must not be changed.
+    """
+
+    def __init__(self, verification_keys: dict[str, str] = VERIFICATION_KEYS, default_key: str = SIGNING_KEY,
+                 maxsize: int = JWT_CACHE_SIZE):
+        self.verification_keys = verification_keys
+        self.default_key = default_key
+        self.maxsize = maxsize
+        self._claims: OrderedDict[bytes, tuple[dict, float, str | None, str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, key_id: str | None) -> str | None:
+        """Key of kid (tokens issued before kid header was added are signed by the current key)"""
+        return self.default_key if key_id is None else self.verification_keys.get(key_id)
+
+    def decode(self, token: str) -> dict:
+        """Get claims of valid token (raises jwt.PyJWTError like jwt.decode)"""
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        cached = self._claims.get(digest)
+        if cached is not None:
+            claims, expires_at, key_id, key = cached
+            if expires_at > time.time() and self.get_key(key_id) == key:
+                self._claims.move_to_end(digest)
+                self.hits += 1
+                return claims
+            del self._claims[digest]  # expired or key rotated out: decoded again to raise
+
+        self.misses += 1
+        key_id = jwt.get_unverified_header(token).get('kid')
+        key = self.get_key(key_id)
+        if key is None:
+            raise jwt.InvalidKeyError('Unknown key id')
+        claims = jwt.decode(token, key, algorithms=[ALGORITHM])
+        expires_at = claims.get('exp')
+        if expires_at is not None:
+            self._claims[digest] = (claims, expires_at, key_id, key)
+            if len(self._claims) > self.maxsize:
+                self._claims.popitem(last=False)
+        return claims
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            'size': len(self._claims),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+        }
+
+
+jwt_cache = JWTDecodeCache()
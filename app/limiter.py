@@ -0,0 +1,220 @@
+import asyncio
+import math
+import re
+import time
+from collections import deque
+
+from pydantic_settings import SettingsConfigDict
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import ConfigBase
+from app.images import images_cfg
+
+READ_CLASS, WRITE_CLASS, AUTH_CLASS, IMAGE_CLASS = 'read', 'write', 'auth', 'image'
+# bcrypt and token endpoints
+AUTH_PATHS = frozenset({'/users/', '/users/token', '/users/access_token', '/users/refresh_token'})
+# uploads wait seconds for image processes: they would hold write slots from db writes meanwhile
+IMAGE_PATH_PATTERN = re.compile(r'^/products/\d+/image$')
+# no db work or long-lived streams
+EXEMPT_PATHS = frozenset({'/', '/docs', '/redoc', '/openapi.json', '/products/events'})
+EXEMPT_PATH_PREFIXES = ('/images/',)  # static files
+DEADLINE_HEADER = 'x-request-timeout'  # seconds the client is going to wait for response
+SERVICE_TIME_WEIGHT = 0.1  # of the last request in moving average
+
+
+class LimiterConfig(ConfigBase):
+    """Limits of concurrent requests per route class, db pool is sized by their sum (see app.database)
+
+    Image uploads hold a db connection only for short queries before and after processing.
+    """
+    READ_LIMIT: int = 9
+    READ_QUEUE: int = 100
+    READ_MAX_WAIT_MS: int = 500
+    WRITE_LIMIT: int = 4
+    WRITE_QUEUE: int = 50
+    WRITE_MAX_WAIT_MS: int = 2000
+    AUTH_LIMIT: int = 2
+    AUTH_QUEUE: int = 20
+    AUTH_MAX_WAIT_MS: int = 1000
+    IMAGE_LIMIT: int = 2  # as many as image processes
+    IMAGE_QUEUE: int = 6
+    IMAGE_MAX_WAIT_MS: int = 5000
+    model_config = SettingsConfigDict(env_prefix='LIMITER_')
+
+    @property
+    def total_limit(self) -> int:
+        """Requests holding db connections at once at most"""
+        return self.READ_LIMIT + self.WRITE_LIMIT + self.AUTH_LIMIT + self.IMAGE_LIMIT
+
+
+limiter_cfg = LimiterConfig()
+
+
+class ConcurrencyLimiter:
+    """Limit of concurrent requests with bounded FIFO queue and wait-time aware shedding"""
+
+    def __init__(self, limit: int, max_queue: int, max_wait: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self.service_time = 0.05  # moving average of seconds per request
+        self.admitted = 0
+        self.shed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        """Approximate seconds until a new request gets a slot"""
+        if self.active < self.limit and not self._waiters:
+            return 0.0
+        return (len(self._waiters) + 1) / self.limit * self.service_time
+
+    async def acquire(self, budget: float) -> bool:
+        """Take slot waiting at most budget seconds (False if request should be shed)"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue or self.expected_wait() > budget:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=budget)
+        except BaseException as error:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # slot was handed over right at timeout
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass  # already dropped by release() as cancelled
+            if isinstance(error, asyncio.TimeoutError):
+                self.shed += 1
+                return False
+            raise
+        self.admitted += 1
+        return True
+
+    def release(self, service_time: float | None = None) -> None:
+        """Free slot (hand it over to the first waiter if any)"""
+        if service_time is not None:
+            self.service_time += SERVICE_TIME_WEIGHT * (service_time - self.service_time)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            'limit': self.limit,
+            'active': self.active,
+            'queue_depth': self.queue_depth,
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'shed': self.shed,
+            'service_time_ms': round(self.service_time * 1000, 2),
+        }
+
+
+limiters = {
+    READ_CLASS: ConcurrencyLimiter(limiter_cfg.READ_LIMIT, limiter_cfg.READ_QUEUE,
+                                   limiter_cfg.READ_MAX_WAIT_MS / 1000),
+    WRITE_CLASS: ConcurrencyLimiter(limiter_cfg.WRITE_LIMIT, limiter_cfg.WRITE_QUEUE,
+                                    limiter_cfg.WRITE_MAX_WAIT_MS / 1000),
+    AUTH_CLASS: ConcurrencyLimiter(limiter_cfg.AUTH_LIMIT, limiter_cfg.AUTH_QUEUE,
+                                   limiter_cfg.AUTH_MAX_WAIT_MS / 1000),
+    IMAGE_CLASS: ConcurrencyLimiter(limiter_cfg.IMAGE_LIMIT, limiter_cfg.IMAGE_QUEUE,
+                                    limiter_cfg.IMAGE_MAX_WAIT_MS / 1000),
+}
+
+
+def get_route_class(method: str, path: str) -> str:
+    if method == 'POST' and path in AUTH_PATHS:
+        return AUTH_CLASS
+    if method == 'POST' and IMAGE_PATH_PATTERN.match(path):
+        return IMAGE_CLASS
+    if method in ('GET', 'HEAD'):
+        return READ_CLASS
+    return WRITE_CLASS
+
+
+def get_wait_budget(limiter: ConcurrencyLimiter, headers: Headers) -> float:
+    """Max seconds to wait for slot: class limit, shortened by client deadline minus service time"""
+    budget = limiter.max_wait
+    client_timeout = headers.get(DEADLINE_HEADER)
+    if client_timeout is not None:
+        try:
+            budget = min(budget, float(client_timeout) - limiter.service_time)
+        except ValueError:
+            pass
+    return max(budget, 0.0)
+
+
+def limit_body_size(receive: Receive, max_bytes: int) -> Receive:
+    """Wrap receive to stop reading request body longer than max_bytes with 413"""
+    received = 0
+
+    async def limited_receive() -> Message:
+        nonlocal received
+        message = await receive()
+        if message['type'] == 'http.request':
+            received += len(message.get('body', b''))
+            if received > max_bytes:
+                raise HTTPException(status_code=413, detail=f'Request body must be at most {max_bytes} bytes')
+        return message
+
+    return limited_receive
+
+
+class ConcurrencyLimitMiddleware:
+    """Admit requests by route class limits, answer fast 503 instead of queueing on db pool"""
+
+    def __init__(self, app: ASGIApp, route_limiters: dict[str, ConcurrencyLimiter] = limiters):
+        self.app = app
+        self.limiters = route_limiters
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get('path', '')
+        if scope['type'] != 'http' or path in EXEMPT_PATHS or path.startswith(EXEMPT_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        route_class = get_route_class(scope['method'], scope['path'])
+        headers = Headers(scope=scope)
+        if route_class == IMAGE_CLASS:
+            # rejected before multipart body is parsed and before taking a slot
+            max_bytes = images_cfg.MAX_UPLOAD_BYTES + images_cfg.MULTIPART_OVERHEAD_BYTES
+            content_length = headers.get('content-length', '')
+            if content_length.isdigit() and int(content_length) > max_bytes:
+                response = JSONResponse({'detail': f'Request body must be at most {max_bytes} bytes'},
+                                        status_code=413)
+                await response(scope, receive, send)
+                return
+            receive = limit_body_size(receive, max_bytes)
+
+        limiter = self.limiters[route_class]
+        if not await limiter.acquire(get_wait_budget(limiter, headers)):
+            retry_after = max(math.ceil(limiter.expected_wait()), 1)
+            response = JSONResponse({'detail': 'Server is overloaded, retry later'}, status_code=503,
+                                    headers={'Retry-After': str(retry_after)})
+            await response(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - started)
@@ -1,15 +1,62 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.routers import categories, products, users, reviews
+from app.autocomplete import autocomplete_updater
+from app.compression import CompressionMiddleware
+from app.database import async_engine
+from app.idempotency import IdempotencyMiddleware, run_idempotency_keys_sweep
+from app.limiter import ConcurrencyLimitMiddleware
+from app.notifications import run_notifications_listener
+from app.query_budget import QueryBudgetMiddleware
+from app.images import image_processor
+from app.routers import categories, products, users, reviews, metrics, images, archive
+from app.routers.operations.archive_operations import run_archive_job
+from app.routers.operations.related_products_operations import run_related_products_job
+from app.routers.operations.seller_stats_operations import run_seller_stats_rebuild
+from app.view_counter import view_counter
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run background jobs while the app is up"""
+    background_tasks = [
+        asyncio.create_task(run_seller_stats_rebuild()),
+        asyncio.create_task(run_idempotency_keys_sweep()),
+        asyncio.create_task(run_notifications_listener()),
+        asyncio.create_task(view_counter.run()),
+        asyncio.create_task(autocomplete_updater.run()),
+        asyncio.create_task(run_related_products_job()),
+        asyncio.create_task(run_archive_job()),
+    ]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    image_processor.shutdown()
+    await async_engine.dispose()  # pooled connections belong to this event loop
+
 
 app = FastAPI(
     title='Проект: Онлайн-магазин',
     version='0.1.0',
+    lifespan=lifespan,
 )
 
+# the last added middleware is the outermost: replayed responses are compressed per client,
+# duplicates waiting for in-flight idempotent request don't hold db slots of limiter
+app.add_middleware(QueryBudgetMiddleware)
+app.add_middleware(ConcurrencyLimitMiddleware)
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 app.include_router(categories.router)
 app.include_router(products.router)
 app.include_router(users.router)
 app.include_router(reviews.router)
+app.include_router(metrics.router)
+app.include_router(images.router)
+app.include_router(archive.router)
 
 @app.get('/')
 async def root():
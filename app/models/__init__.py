@@ -2,5 +2,12 @@ from .products import Product
 from .categories import Category
 from .users import User
 from .reviews import Review
+from .seller_stats import SellerStats
+from .idempotency_keys import IdempotencyKey
+from .product_related import ProductRelated
+from .job_watermarks import JobWatermark
+from .products_archive import ProductArchive
+from .reviews_archive import ReviewArchive
 
-__all__ = ["Category", "Product", "User", "Review"]
\ No newline at end of file
+__all__ = ["Category", "Product", "User", "Review", "SellerStats", "IdempotencyKey", "ProductRelated", "JobWatermark",
+           "ProductArchive", "ReviewArchive"]
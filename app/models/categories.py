@@ -1,4 +1,4 @@
-from sqlalchemy import String, Boolean, ForeignKey
+from sqlalchemy import String, Boolean, ForeignKey, Index, Integer, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -7,11 +7,16 @@ from app.database import Base
 
 class Category(Base):
     __tablename__ = 'categories'
+    __table_args__ = (
+        Index('ix_categories_active_id', 'id', postgresql_where=text('is_active')),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(50), nullable=False)
-    parent_id: Mapped[int | None] = mapped_column(ForeignKey('categories.id'), nullable=True)
+    parent_id: Mapped[int | None] = mapped_column(ForeignKey('categories.id'), nullable=True, index=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # id of deleted category whose cascade deactivated this one: activating it restores only its cascade
+    deactivated_by_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
 
     products: Mapped[list['Product']] = relationship(
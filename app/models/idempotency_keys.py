@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy import String, Integer, DateTime, LargeBinary, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """First response of request with Idempotency-Key header (status_code is NULL while in progress)"""
+    __tablename__ = 'idempotency_keys'
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)  # digest of key, method, path and auth
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    response_headers: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    response_body: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
@@ -0,0 +1,15 @@
+from sqlalchemy import ForeignKey, SmallInteger, Float
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ProductRelated(Base):
+    """Top related products of product by co-reviews, rebuilt by background job"""
+    __tablename__ = 'product_related'
+
+    product_id: Mapped[int] = mapped_column(ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    rank: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    related_product_id: Mapped[int] = mapped_column(ForeignKey('products.id', ondelete='CASCADE'),
+                                                    nullable=False)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
@@ -1,6 +1,8 @@
+from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import String, Boolean, Numeric, CheckConstraint, ForeignKey, text
+from sqlalchemy import String, Boolean, Numeric, CheckConstraint, ForeignKey, Index, BigInteger, Float, \
+    DateTime, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -10,7 +12,23 @@ class Product(Base):
     __tablename__ = 'products'
     __table_args__ = (
         CheckConstraint('stock >= 0', name='check_stock_positive'),
-        CheckConstraint('price >= 0', name='check_price_positive')
+        CheckConstraint('price >= 0', name='check_price_positive'),
+        # hot listings read only visible products, so they skip the categories join
+        Index('ix_products_visible_in_stock', 'id',
+              postgresql_where=text('is_visible AND stock > 0')),
+        Index('ix_products_visible_category_id', 'category_id',
+              postgresql_where=text('is_visible')),
+        Index('ix_products_active_seller_id_stock', 'seller_id', 'stock',
+              postgresql_where=text('is_active')),
+        Index('ix_products_visible_trending_score', text('trending_score DESC'),
+              postgresql_where=text('is_visible')),
+        # facets of category subtree by index-only scan
+        Index('ix_products_visible_in_stock_category_id', 'category_id',
+              postgresql_include=['price', 'rating'],
+              postgresql_where=text('is_visible AND stock > 0')),
+        # archival job picks deleted products by time of deletion
+        Index('ix_products_inactive_deactivated_at', 'deactivated_at',
+              postgresql_where=text('NOT is_active')),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -20,9 +38,16 @@ class Product(Base):
     image_url: Mapped[str | None] = mapped_column(String(200), nullable=True)
     stock: Mapped[int] = mapped_column(nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # is_active of product AND its category AND all ancestor categories
+    is_visible: Mapped[bool] = mapped_column(Boolean, default=True, server_default=text('true'), nullable=False)
     category_id: Mapped[int] = mapped_column(ForeignKey('categories.id'), nullable=False, index=True)
     seller_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False, index=True)
-    rating: Mapped[Decimal] = mapped_column(Numeric(3, 2), default=0.00, nullable=False)
+    rating: Mapped[Decimal] = mapped_column(Numeric(3, 2), default=Decimal('0.00'), nullable=False)
+    views_count: Mapped[int] = mapped_column(BigInteger, default=0, server_default=text('0'), nullable=False)
+    # log of views sum, each view weighted by exp(decay * view time): grows with recent views only
+    trending_score: Mapped[float] = mapped_column(Float, default=0.0, server_default=text('0'), nullable=False)
+    # set on delete, inactive products are moved to products_archive after retention
+    deactivated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     category: Mapped["Category"] = relationship(
         'Category',
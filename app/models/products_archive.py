@@ -0,0 +1,29 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import String, Boolean, Numeric, BigInteger, Float, DateTime, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ProductArchive(Base):
+    """Product deleted longer than retention ago, moved out of hot products table"""
+    __tablename__ = 'products_archive'
+
+    # same columns as products without foreign keys: archived rows don't hold categories and users
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    description: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    image_url: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    stock: Mapped[int] = mapped_column(nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    is_visible: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    category_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    seller_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    rating: Mapped[Decimal] = mapped_column(Numeric(3, 2), nullable=False)
+    views_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    trending_score: Mapped[float] = mapped_column(Float, nullable=False)
+    deactivated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, ForeignKey, DateTime, Integer, Boolean, UniqueConstraint
+from sqlalchemy import String, ForeignKey, DateTime, Integer, Boolean, UniqueConstraint, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -15,6 +15,8 @@ class Review(Base):
     comment_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, nullable=False)
     grade: Mapped[int] = mapped_column(Integer, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # set on delete, inactive reviews are moved to reviews_archive after retention
+    deactivated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     user: Mapped["User"] = relationship(
         'User',
@@ -28,4 +30,7 @@ class Review(Base):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'product_id', name='unique_user_product_review'),
+        Index('ix_reviews_active_product_id', 'product_id', postgresql_where=text('is_active')),
+        Index('ix_reviews_active_id', 'id', postgresql_where=text('is_active')),
+        Index('ix_reviews_inactive_deactivated_at', 'deactivated_at', postgresql_where=text('NOT is_active')),
     )
\ No newline at end of file
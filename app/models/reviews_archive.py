@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, Integer, Boolean
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ReviewArchive(Base):
+    """Review deleted longer than retention ago or review of archived product"""
+    __tablename__ = 'reviews_archive'
+
+    # same columns as reviews without foreign keys and unique constraint: (user_id, product_id)
+    # can repeat here, a restored review must not collide with a newer one in reviews
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    comment: Mapped[str | None] = mapped_column(String(1000), nullable=True)
+    comment_date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    grade: Mapped[int] = mapped_column(Integer, nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    deactivated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
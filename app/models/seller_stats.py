@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Integer, ForeignKey, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class SellerStats(Base):
+    """Seller dashboard aggregates maintained by deltas on product and review writes"""
+    __tablename__ = 'seller_stats'
+
+    seller_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
+    products_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total_stock: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    low_stock_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    reviews_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    grades_sum: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, nullable=False)
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import Callable
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_engine
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 1
+RECONNECT_MAX_DELAY_SECONDS = 30
+RESET_PAYLOAD = '*'  # sent to handlers after (re)connect: notifications could be missed meanwhile
+
+_handlers: dict[str, list[Callable[[str], None]]] = defaultdict(list)
+
+
+def add_notification_handler(channel: str, handler: Callable[[str], None]) -> None:
+    """Call handler(payload) on every NOTIFY to channel from any worker (this one included)"""
+    _handlers[channel].append(handler)
+
+
+async def notify(channel: str, payload: str, db: AsyncSession) -> None:
+    """NOTIFY channel in current transaction (delivered to listeners on commit, dropped on rollback)"""
+    await db.execute(select(func.pg_notify(channel, payload)))
+
+
+def _dispatch(channel: str, payload: str) -> None:
+    for handler in _handlers.get(channel, ()):
+        try:
+            handler(payload)
+        except Exception:
+            logger.exception("Notification handler of channel %s failed", channel)
+
+
+async def run_notifications_listener() -> None:
+    """LISTEN to all channels with handlers on one dedicated connection, reconnect if it's lost"""
+    delay = RECONNECT_DELAY_SECONDS
+    while True:
+        try:
+            async with async_engine.connect() as connection:
+                raw_connection = await connection.get_raw_connection()
+                driver_connection = raw_connection.driver_connection  # asyncpg connection
+                lost = asyncio.Event()
+                driver_connection.add_termination_listener(lambda _: lost.set())
+                listener = lambda _conn, _pid, channel, payload: _dispatch(channel, payload)
+                for channel in _handlers:
+                    await driver_connection.add_listener(channel, listener)
+                try:
+                    for channel in _handlers:
+                        _dispatch(channel, RESET_PAYLOAD)
+                    delay = RECONNECT_DELAY_SECONDS
+                    await lost.wait()
+                finally:
+                    if not driver_connection.is_closed():
+                        for channel in _handlers:
+                            await driver_connection.remove_listener(channel, listener)
+            logger.warning("Notifications listener connection is lost, reconnecting")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Notifications listener failed, reconnecting in %s s", delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, RECONNECT_MAX_DELAY_SECONDS)
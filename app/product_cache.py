@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+from pydantic_settings import SettingsConfigDict
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ConfigBase
+from app.generation_cache import GenerationCache
+from app.notifications import add_notification_handler, notify, RESET_PAYLOAD
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is optional, in-process stand-in is used without it
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_CACHE_CHANNEL = 'product_cache'
+
+
+class ProductCacheConfig(ConfigBase):
+    LOCAL_SIZE: int = 10_000
+    LOCAL_TTL_SECONDS: int = 300
+    SHARED_TTL_SECONDS: int = 60
+    REDIS_URL: str | None = None  # shared tier for all workers (in-process stand-in if not set)
+    model_config = SettingsConfigDict(env_prefix='PRODUCT_CACHE_')
+
+
+product_cache_cfg = ProductCacheConfig()
+
+
+class SharedCache(Protocol):
+    """Cache shared by all workers"""
+
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl_seconds: int) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+    async def clear(self, prefix: str) -> None: ...
+
+
+class InMemorySharedCache:
+    """Local stand-in of shared cache (for one worker, tests and development)
+
+    Entries are kept in order of writing: with one TTL it is the order of expiration too,
+    so expired and overflowing entries are dropped from the front.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._values: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        value = self._values.get(key)
+        if value is None:
+            return None
+        if value[1] < time.monotonic():
+            del self._values[key]
+            return None
+        return value[0]
+
+    async def set(self, key: str, value: bytes, ttl_seconds: int) -> None:
+        now = time.monotonic()
+        self._values[key] = (value, now + ttl_seconds)
+        self._values.move_to_end(key)
+        while self._values and (len(self._values) > self.maxsize or next(iter(self._values.values()))[1] < now):
+            self._values.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+
+    async def clear(self, prefix: str) -> None:
+        for key in [key for key in self._values if key.startswith(prefix)]:
+            del self._values[key]
+
+
+class RedisSharedCache:
+    def __init__(self, url: str):
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: int) -> None:
+        await self._redis.set(key, value, ex=ttl_seconds)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.unlink(key)
+
+    async def clear(self, prefix: str) -> None:
+        keys = [key async for key in self._redis.scan_iter(match=prefix + '*', count=1000)]
+        if keys:
+            await self._redis.unlink(*keys)
+
+
+class ProductCache:
+    """Serialized product details: in-process LRU in front of shared cache"""
+
+    key_prefix = 'product:'
+
+    def __init__(self, shared: SharedCache, local_size: int, local_ttl_seconds: int, shared_ttl_seconds: int):
+        self.shared = shared
+        self.shared_ttl_seconds = shared_ttl_seconds
+        self._local = GenerationCache(maxsize=local_size, ttl_seconds=local_ttl_seconds)
+        self.local_hits = self.shared_hits = self.misses = self.invalidations = 0
+        self.notifications = 0
+        self.lag_total = self.lag_max = 0.0
+        self._shared_invalidations: set[asyncio.Task] = set()
+
+    @property
+    def generation(self) -> int:
+        return self._local.generation
+
+    async def get(self, product_id: int) -> bytes | None:
+        value = self._local.get(product_id)
+        if value is not None:
+            self.local_hits += 1
+            return value
+
+        generation = self.generation
+        shared_value = await self.shared.get(f'{self.key_prefix}{product_id}')
+        if shared_value is not None:
+            self.shared_hits += 1
+            self._local.set(product_id, shared_value, generation)
+            return shared_value
+        self.misses += 1
+        return None
+
+    async def set(self, product_id: int, value: bytes, generation: int) -> None:
+        """Cache value read from db when cache generation was `generation`"""
+        if not self._local.set(product_id, value, generation):
+            return
+        key = f'{self.key_prefix}{product_id}'
+        await self.shared.set(key, value, self.shared_ttl_seconds)
+        if generation != self.generation:  # invalidated while writing: the value could be stale already
+            await self.shared.delete(key)
+
+    async def invalidate(self, product_id: int | None) -> None:
+        """Drop product (all products if None) from both tiers"""
+        self.invalidate_local(product_id)
+        await self._invalidate_shared(product_id)
+
+    def invalidate_local(self, product_id: int | None) -> None:
+        self.invalidations += 1
+        if product_id is None:
+            self._local.clear()
+        else:
+            self._local.invalidate(product_id)
+
+    def handle_notification(self, payload: str) -> None:
+        """Drop product changed by any worker from both tiers, payload is '<product_id or *>:<sent unix time>'
+
+        A worker that read the product before the write could have put it to the shared tier
+        after the writer dropped it there: every worker drops it again once it's notified.
+        """
+        if payload == RESET_PAYLOAD:
+            # shared entries of writes missed meanwhile expire in SHARED_TTL_SECONDS
+            self.invalidate_local(None)
+            return
+        product_id, _, sent_at = payload.partition(':')
+        product_id = None if product_id == RESET_PAYLOAD else int(product_id)
+        self.invalidate_local(product_id)
+        task = asyncio.get_running_loop().create_task(self._invalidate_shared(product_id))
+        self._shared_invalidations.add(task)
+        task.add_done_callback(self._shared_invalidations.discard)
+        lag = max(time.time() - float(sent_at), 0.0)
+        self.notifications += 1
+        self.lag_total += lag
+        self.lag_max = max(self.lag_max, lag)
+
+    def stats(self) -> dict:
+        requests = self.local_hits + self.shared_hits + self.misses
+        return {
+            'local_size': len(self._local),
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': (self.local_hits + self.shared_hits) / requests if requests else 0.0,
+            'invalidations': self.invalidations,
+            'invalidation_lag_avg_seconds': self.lag_total / self.notifications if self.notifications else 0.0,
+            'invalidation_lag_max_seconds': self.lag_max,
+        }
+
+    async def _invalidate_shared(self, product_id: int | None) -> None:
+        try:
+            if product_id is None:
+                await self.shared.clear(self.key_prefix)
+            else:
+                await self.shared.delete(f'{self.key_prefix}{product_id}')
+        except Exception:
+            logger.exception("Shared product cache invalidation failed")
+
+
+def create_shared_cache() -> SharedCache:
+    if product_cache_cfg.REDIS_URL is None:
+        return InMemorySharedCache(product_cache_cfg.LOCAL_SIZE)
+    if redis is None:
+        logger.warning("PRODUCT_CACHE_REDIS_URL is set, but redis is not installed: using in-process cache")
+        return InMemorySharedCache(product_cache_cfg.LOCAL_SIZE)
+    return RedisSharedCache(product_cache_cfg.REDIS_URL)
+
+
+product_cache = ProductCache(create_shared_cache(),
+                             local_size=product_cache_cfg.LOCAL_SIZE,
+                             local_ttl_seconds=product_cache_cfg.LOCAL_TTL_SECONDS,
+                             shared_ttl_seconds=product_cache_cfg.SHARED_TTL_SECONDS)
+add_notification_handler(PRODUCT_CACHE_CHANNEL, product_cache.handle_notification)
+
+
+async def notify_product_changed(product_id: int | None, db: AsyncSession) -> None:
+    """Tell all workers on commit to drop cached product (all products if None)"""
+    key = RESET_PAYLOAD if product_id is None else str(product_id)
+    await notify(PRODUCT_CACHE_CHANNEL, f'{key}:{time.time()}', db)
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+
+from sqlalchemy import select, func, cast, true, String, Text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.notifications import add_notification_handler, notify, RESET_PAYLOAD
+
+PRODUCT_EVENTS_CHANNEL = 'product_events'
+PRODUCT_EVENTS_QUEUE_SIZE = 100  # events buffered per client, a slower client gets 'reset' instead
+PRODUCT_EVENTS_MAX_SUBSCRIBERS = 1000  # per worker
+PRODUCT_EVENTS_HEARTBEAT_SECONDS = 15  # comment line keeps idle connection open through proxies
+PRODUCT_EVENTS_RETRY_MS = 3000  # client reconnect delay
+# sent instead of missed events: client should fetch products it shows again
+RESET_EVENT = b'event: reset\ndata: {}\n\n'
+
+
+class Subscriber:
+    def __init__(self, category_ids: set[int], product_ids: set[int], queue_size: int):
+        self.category_ids = category_ids
+        self.product_ids = product_ids
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=queue_size)
+
+    def matches(self, event: dict) -> bool:
+        if not self.category_ids and not self.product_ids:
+            return True
+        return (event['product_id'] in self.product_ids
+                or event['category_id'] in self.category_ids
+                or event.get('previous_category_id') in self.category_ids)
+
+    def put(self, message: bytes) -> bool:
+        """Buffer message, on overflow replace the buffer by one reset event (False if events are dropped)"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET_EVENT)
+            return False
+
+
+class ProductEventsBroadcaster:
+    """Fan-out of product change notifications of all workers to SSE clients of this worker"""
+
+    def __init__(self, queue_size: int = PRODUCT_EVENTS_QUEUE_SIZE,
+                 max_subscribers: int = PRODUCT_EVENTS_MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: set[Subscriber] = set()
+        self.events = 0
+        self.overflows = 0
+
+    def subscribe(self, category_ids: set[int], product_ids: set[int]) -> Subscriber | None:
+        """Get new subscriber (None if worker has too many of them)"""
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(category_ids, product_ids, self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def handle_notification(self, payload: str) -> None:
+        if payload == RESET_PAYLOAD:  # listener reconnected, events could be missed
+            for subscriber in self._subscribers:
+                subscriber.put(RESET_EVENT)
+            return
+        event = json.loads(payload)
+        message = f'event: {event["type"]}\ndata: {payload}\n\n'.encode()  # formatted once for all clients
+        self.events += 1
+        for subscriber in self._subscribers:
+            if subscriber.matches(event) and not subscriber.put(message):
+                self.overflows += 1
+
+    async def stream(self, subscriber: Subscriber) -> AsyncIterator[bytes]:
+        """SSE messages of subscriber until client disconnects"""
+        try:
+            yield f'retry: {PRODUCT_EVENTS_RETRY_MS}\n\n'.encode()
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), timeout=PRODUCT_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b': heartbeat\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            'subscribers': len(self._subscribers),
+            'max_subscribers': self.max_subscribers,
+            'events': self.events,
+            'overflows': self.overflows,
+        }
+
+
+product_events = ProductEventsBroadcaster()
+add_notification_handler(PRODUCT_EVENTS_CHANNEL, product_events.handle_notification)
+
+
+async def notify_product_event(event_type: str, db_product, db: AsyncSession,
+                               previous_category_id: int | None = None) -> None:
+    """Send product price and stock to SSE clients of all workers on commit"""
+    event = {
+        'type': event_type,
+        'product_id': db_product.id,
+        'category_id': db_product.category_id,
+        'price': str(db_product.price),
+        'stock': db_product.stock,
+        'at': time.time(),
+    }
+    if previous_category_id is not None and previous_category_id != db_product.category_id:
+        event['previous_category_id'] = previous_category_id
+    await notify(PRODUCT_EVENTS_CHANNEL, json.dumps(event), db)
+
+
+async def notify_products_events(event_type: str, products, db: AsyncSession, where=true()) -> None:
+    """Send event of every product returned by data-modifying CTE products, in one query for all of them
+
+    products must have id, category_id, price and stock columns (of UPDATE ... RETURNING).
+    """
+    event = func.json_build_object('type', event_type,
+                                   'product_id', products.c.id,
+                                   'category_id', products.c.category_id,
+                                   'price', cast(products.c.price, String),
+                                   'stock', products.c.stock,
+                                   'at', func.extract('epoch', func.now()))
+    await db.execute(select(func.pg_notify(PRODUCT_EVENTS_CHANNEL, cast(event, Text)))
+                     .select_from(products)
+                     .where(where))
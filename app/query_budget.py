@@ -0,0 +1,164 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+from pydantic_settings import SettingsConfigDict
+from sqlalchemy import event
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import ConfigBase
+from app.database import async_engine
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetConfig(ConfigBase):
+    ENFORCE: bool = False  # answer 500 on exceeded budget (for tests and local runs)
+    model_config = SettingsConfigDict(env_prefix='QUERY_BUDGET_')
+
+
+query_budget_cfg = QueryBudgetConfig()
+
+# Max SQL statements per request of route (method, path template), including auth queries
+ROUTE_QUERY_BUDGETS: dict[tuple[str, str], int] = {
+    ('GET', '/categories/'): 1,
+    ('GET', '/categories/tree'): 1,
+    ('POST', '/categories/'): 4,
+    ('PUT', '/categories/{category_id}'): 6,
+    ('DELETE', '/categories/{category_id}'): 6,
+    ('PUT', '/categories/{category_id}/activate'): 7,
+    ('GET', '/products/'): 1,
+    ('POST', '/products/'): 6,
+    ('GET', '/products/category/{category_id}'): 2,
+    ('GET', '/products/trending'): 1,
+    ('GET', '/products/autocomplete'): 0,
+    ('GET', '/products/events'): 0,
+    ('GET', '/products/facets'): 2,
+    ('GET', '/products/{product_id}'): 1,
+    ('GET', '/products/{product_id}/related'): 1,
+    ('PUT', '/products/{product_id}'): 8,
+    ('DELETE', '/products/{product_id}'): 6,
+    ('POST', '/products/{product_id}/image'): 4,
+    ('GET', '/reviews'): 1,
+    ('GET', '/products/{product_id}/reviews'): 2,
+    ('POST', '/reviews'): 6,
+    ('DELETE', '/reviews/{review_id}'): 7,
+    ('POST', '/users/'): 2,
+    ('POST', '/users/token'): 1,
+    ('POST', '/users/access_token'): 1,
+    ('POST', '/users/refresh_token'): 1,
+    ('GET', '/users/me/stats'): 2,
+    ('GET', '/users/me/products'): 2,
+    ('GET', '/users/{user_id}'): 1,
+    ('PUT', '/users/{user_id}/update_role'): 3,
+    ('PUT', '/archive/products/{product_id}/restore'): 9,
+    ('PUT', '/archive/reviews/{review_id}/restore'): 8,
+    ('GET', '/'): 0,
+    ('GET', '/images/{digest}/{name}'): 0,
+    ('GET', '/metrics/product_cache'): 1,
+    ('GET', '/metrics/limiter'): 1,
+    ('GET', '/metrics/autocomplete'): 1,
+    ('GET', '/metrics/slow_queries'): 1,
+    ('GET', '/metrics/product_events'): 1,
+    ('GET', '/metrics/jwt_cache'): 1,
+}
+
+
+class QueryCounter:
+    def __init__(self, scope: Scope | None = None):
+        self.count = 0
+        self.scope = scope  # of request executing the queries
+
+
+_query_counter: ContextVar[QueryCounter | None] = ContextVar('query_counter', default=None)
+
+
+@event.listens_for(async_engine.sync_engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+@contextmanager
+def count_queries(scope: Scope | None = None):
+    """Count SQL statements executed by async_engine inside the block"""
+    counter = QueryCounter(scope)
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+
+def get_route_key(scope: Scope) -> tuple[str, str] | None:
+    """Get (method, path template) of matched API route"""
+    route = scope.get('route')
+    if not isinstance(route, APIRoute) or scope['method'] not in route.methods:
+        return None  # not found, method not allowed or docs
+    return scope['method'], route.path
+
+
+def get_current_route() -> str | None:
+    """Get 'METHOD /path/template' of request executing SQL statement now"""
+    counter = _query_counter.get()
+    if counter is None or counter.scope is None:
+        return None
+    route_key = get_route_key(counter.scope)
+    return None if route_key is None else ' '.join(route_key)
+
+
+class QueryBudgetMiddleware:
+    """Count SQL statements of every request and check them with declared route budget"""
+
+    def __init__(self, app: ASGIApp,
+                 budgets: dict[tuple[str, str], int] = ROUTE_QUERY_BUDGETS,
+                 enforce: bool = query_budget_cfg.ENFORCE):
+        self.app = app
+        self.budgets = budgets
+        self.enforce = enforce
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries(scope) as counter:
+            replaced = False
+
+            async def check_budget_send(message: Message) -> None:
+                nonlocal replaced
+                if replaced:
+                    return  # drop the rest of original response
+                if message['type'] == 'http.response.start':
+                    error = self.check_budget(scope, counter.count)
+                    if self.enforce:
+                        if error is not None:
+                            replaced = True
+                            response = JSONResponse({'detail': error}, status_code=500,
+                                                    headers={'X-Query-Count': str(counter.count)})
+                            await response(scope, receive, send)
+                            return
+                        message.setdefault('headers', []).append(
+                            (b'x-query-count', str(counter.count).encode()))
+                await send(message)
+
+            await self.app(scope, receive, check_budget_send)
+
+    def check_budget(self, scope: Scope, query_count: int) -> str | None:
+        """Get error message if request went over its route budget"""
+        route_key = get_route_key(scope)
+        if route_key is None:
+            return None  # not found, nothing to check
+        budget = self.budgets.get(route_key)
+        if budget is None:
+            error = f'No query budget declared for {route_key[0]} {route_key[1]}'
+        elif query_count > budget:
+            error = f'{route_key[0]} {route_key[1]} executed {query_count} SQL statements, budget is {budget}'
+        else:
+            return None
+        logger.warning(error)
+        return error
+
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends
+
+from app.routers.operations.archive_operations import restore_and_get_product, restore_and_get_review
+from app.schemas import Product as ProductSchema, Review as ReviewSchema
+from app.models.users import User as UserModel
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db_depends import get_async_db
+from app.auth import get_current_admin
+
+router = APIRouter(
+    prefix='/archive',
+    tags=['archive']
+)
+
+
+@router.put('/products/{product_id}/restore', response_model=ProductSchema, status_code=200)
+async def restore_product(product_id: int,
+                          db: AsyncSession = Depends(get_async_db),
+                          current_admin: UserModel = Depends(get_current_admin)):
+    """Move archived product with reviews archived together with it back and set is_active=True"""
+    return await restore_and_get_product(product_id, db)
+
+
+@router.put('/reviews/{review_id}/restore', response_model=ReviewSchema, status_code=200)
+async def restore_review(review_id: int,
+                         db: AsyncSession = Depends(get_async_db),
+                         current_admin: UserModel = Depends(get_current_admin)):
+    """Move archived review back and set is_active=True (409 if the user has a newer review of the product)"""
+    return await restore_and_get_review(review_id, db)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
 from app.routers.operations.categories_operations import get_categories_from_db, check_category_by_id, \
-    create_and_get_category, update_and_get_category, delete_and_get_category, get_category_by_id
-from app.schemas import CategoryCreate, Category as CategorySchema
+    create_and_get_category, update_and_get_category, delete_and_get_category, get_category_by_id, \
+    get_categories_tree_json, activate_and_get_category
+from app.schemas import CategoryCreate, Category as CategorySchema, CategoryTree as CategoryTreeSchema
 from app.models.users import User as UserModel
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -20,6 +21,14 @@ async def get_all_categories(db: AsyncSession = Depends(get_async_db)):
     return await get_categories_from_db(db)
 
 
+@router.get('/tree', response_model=list[CategoryTreeSchema], status_code=200)
+async def get_categories_tree(with_products_count: bool = False,
+                              db: AsyncSession = Depends(get_async_db)):
+    """Get nested tree of active categories"""
+    tree_json = await get_categories_tree_json(db, with_products_count)
+    return Response(content=tree_json, media_type='application/json')
+
+
 @router.post('/', response_model=CategorySchema, status_code=201)
 async def create_category(category: CategoryCreate,
                           db: AsyncSession = Depends(get_async_db),
@@ -43,6 +52,14 @@ async def update_category(category_id: int,
 async def delete_category(category_id: int,
                           db: AsyncSession = Depends(get_async_db),
                           current_admin: UserModel = Depends(get_current_admin)):
-    """Set is_active=False of Category by id"""
+    """Set is_active=False of Category with its subcategories by id"""
     db_category = await get_category_by_id(category_id, db)
     return await delete_and_get_category(db_category, db)
+
+
+@router.put('/{category_id}/activate', response_model=CategorySchema, status_code=200)
+async def activate_category(category_id: int,
+                            db: AsyncSession = Depends(get_async_db),
+                            current_admin: UserModel = Depends(get_current_admin)):
+    """Set is_active=True of Category with its subcategories by id"""
+    return await activate_and_get_category(category_id, db)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import FileResponse
+
+from app.images import image_processor, IMAGE_DIGEST_PATTERN, IMAGE_NAME_PATTERN, IMAGE_MEDIA_TYPES, \
+    IMMUTABLE_CACHE_CONTROL
+
+router = APIRouter(
+    prefix='/images',
+    tags=['images']
+)
+
+
+@router.get('/{digest}/{name}', status_code=200)
+async def get_image(digest: str, name: str):
+    """Get product image or its thumbnail by content digest (cached by clients forever)"""
+    path = None
+    if IMAGE_DIGEST_PATTERN.match(digest) and IMAGE_NAME_PATTERN.match(name):
+        path = image_processor.storage.get_path(f'{digest}/{name}')
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail='Image not found')
+    return FileResponse(path, media_type=IMAGE_MEDIA_TYPES[name.rpartition('.')[2]],
+                        headers={'Cache-Control': IMMUTABLE_CACHE_CONTROL})
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends
+
+from app.auth import get_current_admin
+from app.autocomplete import autocomplete_index
+from app.jwt_cache import jwt_cache
+from app.limiter import limiters
+from app.models.users import User as UserModel
+from app.product_cache import product_cache
+from app.product_events import product_events
+from app.slow_queries import slow_query_log
+
+router = APIRouter(
+    prefix='/metrics',
+    tags=['metrics']
+)
+
+
+@router.get('/product_cache', status_code=200)
+async def get_product_cache_metrics(current_admin: UserModel = Depends(get_current_admin)):
+    """Get hit rate and invalidation lag of product details cache"""
+    return product_cache.stats()
+
+
+@router.get('/limiter', status_code=200)
+async def get_limiter_metrics(current_admin: UserModel = Depends(get_current_admin)):
+    """Get queue depth and shed count of concurrency limiter per route class"""
+    return {route_class: limiter.stats() for route_class, limiter in limiters.items()}
+
+
+@router.get('/autocomplete', status_code=200)
+async def get_autocomplete_metrics(current_admin: UserModel = Depends(get_current_admin)):
+    """Get entries count and approximate memory of autocomplete index"""
+    return autocomplete_index.stats()
+
+
+@router.get('/slow_queries', status_code=200)
+async def get_slow_queries(current_admin: UserModel = Depends(get_current_admin)):
+    """Get slow SQL statements by fingerprint (with plans if captured) and the most recent ones"""
+    return slow_query_log.stats()
+
+
+@router.get('/product_events', status_code=200)
+async def get_product_events_metrics(current_admin: UserModel = Depends(get_current_admin)):
+    """Get SSE clients count and overflowed client buffers of product events"""
+    return product_events.stats()
+
+
+@router.get('/jwt_cache', status_code=200)
+async def get_jwt_cache_metrics(current_admin: UserModel = Depends(get_current_admin)):
+    """Get size and hit rate of verified token claims cache"""
+    return jwt_cache.stats()
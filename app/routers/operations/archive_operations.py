@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, delete, insert, func, not_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+from app.models import Product as ProductModel, Review as ReviewModel, \
+    ProductArchive as ProductArchiveModel, ReviewArchive as ReviewArchiveModel
+from app.product_cache import notify_product_changed
+from app.product_events import notify_product_event
+from app.routers.operations.categories_operations import check_category_by_id, invalidate_categories_tree_cache
+from app.routers.operations.reviews_operations import update_product_rating
+from app.routers.operations.seller_stats_operations import apply_seller_stats_delta, product_stats_delta, \
+    review_stats_delta
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_RETENTION_DAYS = 30  # deleted rows stay restorable in hot tables for this long
+ARCHIVE_BATCH_SIZE = 500  # rows per transaction: short row locks, small WAL bursts
+ARCHIVE_BATCH_PAUSE_SECONDS = 0.1  # between batches, lets replicas and autovacuum keep up
+ARCHIVE_INTERVAL_MINUTES = 60
+
+PRODUCT_COLUMNS = [column.name for column in ProductModel.__table__.columns]
+REVIEW_COLUMNS = [column.name for column in ReviewModel.__table__.columns]
+
+
+def _move_rows(source, target, columns: list[str], where, name: str):
+    """Data-modifying CTE pair: DELETE rows of source RETURNING them, INSERT them into target
+
+    archived_at is set when target is an archive table.
+    """
+    moved = delete(source).where(where).returning(*source.__table__.columns).cte(f'moved_{name}')
+    values = [moved.c[column] for column in columns]
+    target_columns = list(columns)
+    if 'archived_at' in target.__table__.columns:
+        values.append(func.now())
+        target_columns.append('archived_at')
+    return moved, insert(target).from_select(target_columns, select(*values)).cte(f'inserted_{name}')
+
+
+async def archive_reviews_batch(db: AsyncSession, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move one batch of reviews deleted before retention to reviews_archive and commit"""
+    batch = (select(ReviewModel.id)
+             .where(not_(ReviewModel.is_active),
+                    ReviewModel.deactivated_at < func.now() - timedelta(days=ARCHIVE_RETENTION_DAYS))
+             .order_by(ReviewModel.deactivated_at)
+             .limit(batch_size)
+             .with_for_update(skip_locked=True)  # rows locked by a writer or another worker are taken next time
+             .cte('batch'))
+    moved, inserted = _move_rows(ReviewModel, ReviewArchiveModel, REVIEW_COLUMNS,
+                                 ReviewModel.id.in_(select(batch.c.id)), 'reviews')
+    # inactive reviews are not counted in seller stats and rating: nothing else to update
+    archived = (await db.execute(select(func.count()).select_from(moved).add_cte(inserted))).scalar()
+    await db.commit()
+    return archived
+
+
+async def archive_products_batch(db: AsyncSession, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move one batch of products deleted before retention with all their reviews to archive and commit"""
+    batch = (select(ProductModel.id, ProductModel.seller_id)
+             .where(not_(ProductModel.is_active),
+                    ProductModel.deactivated_at < func.now() - timedelta(days=ARCHIVE_RETENTION_DAYS))
+             .order_by(ProductModel.deactivated_at)
+             .limit(batch_size)
+             .with_for_update(skip_locked=True)
+             .cte('batch'))
+    # reviews reference products: both are deleted by one statement, foreign key is checked at its end
+    moved_reviews, inserted_reviews = _move_rows(ReviewModel, ReviewArchiveModel, REVIEW_COLUMNS,
+                                                 ReviewModel.product_id.in_(select(batch.c.id)), 'reviews')
+    _, inserted_products = _move_rows(ProductModel, ProductArchiveModel, PRODUCT_COLUMNS,
+                                      ProductModel.id.in_(select(batch.c.id)), 'products')
+    # active reviews of deleted products are counted in seller stats until they are archived
+    is_active = moved_reviews.c.is_active == True
+    sellers = (await db.execute(
+        select(batch.c.seller_id,
+               func.count(func.distinct(batch.c.id)),
+               func.count(moved_reviews.c.id).filter(is_active),
+               func.coalesce(func.sum(moved_reviews.c.grade).filter(is_active), 0))
+        .outerjoin(moved_reviews, moved_reviews.c.product_id == batch.c.id)
+        .group_by(batch.c.seller_id)
+        .add_cte(inserted_reviews, inserted_products)
+    )).all()
+    for seller_id, _, reviews_count, grades_sum in sellers:
+        await apply_seller_stats_delta(seller_id, {'reviews_count': -reviews_count, 'grades_sum': -grades_sum}, db)
+    await db.commit()
+    return sum(products_count for _, products_count, _, _ in sellers)
+
+
+async def archive_inactive_rows() -> int:
+    """Archive all rows deleted before retention batch by batch, each batch in its own transaction"""
+    archived = 0
+    # reviews first: a product is archived with all of its reviews anyway
+    for archive_batch in (archive_reviews_batch, archive_products_batch):
+        while True:
+            async with async_session_maker() as db:
+                batch_archived = await archive_batch(db)
+            archived += batch_archived
+            if batch_archived < ARCHIVE_BATCH_SIZE:
+                break
+            await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+    return archived
+
+
+async def run_archive_job() -> None:
+    """Archive deleted rows periodically (batches are split between workers by SKIP LOCKED)"""
+    while True:
+        try:
+            archived = await archive_inactive_rows()
+            if archived:
+                logger.info("%s deleted products and reviews are archived", archived)
+        except Exception:
+            logger.exception("Archival of deleted rows failed")
+        await asyncio.sleep(ARCHIVE_INTERVAL_MINUTES * 60)
+
+
+async def restore_and_get_review(review_id: int, db: AsyncSession):
+    """Move archived review back to reviews as active one and update rating of its product"""
+    db_archived = await db.get(ReviewArchiveModel, review_id)
+    if db_archived is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail='Archived review not found')
+    db_product = await db.get(ProductModel, db_archived.product_id)
+    if db_product is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail='Product of review is archived, restore it first')
+
+    db_review = ReviewModel(**{column: getattr(db_archived, column) for column in REVIEW_COLUMNS})
+    db_review.is_active, db_review.deactivated_at = True, None
+    db.add(db_review)
+    await db.delete(db_archived)
+    try:
+        await db.flush()
+    except IntegrityError:  # user wrote a new review of the product after this one was archived
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail='User already has a review of this product')
+    await apply_seller_stats_delta(db_product.seller_id, review_stats_delta(db_review.grade, 1), db)
+    await update_product_rating(db_review.product_id, db)
+    return db_review
+
+
+async def restore_and_get_product(product_id: int, db: AsyncSession):
+    """Move archived product back to products as active one, with the reviews archived together with it"""
+    db_archived = await db.get(ProductArchiveModel, product_id)
+    if db_archived is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail='Archived product not found')
+    await check_category_by_id(db_archived.category_id, db)  # active category has active ancestors
+
+    db_product = ProductModel(**{column: getattr(db_archived, column) for column in PRODUCT_COLUMNS})
+    db_product.is_active, db_product.is_visible, db_product.deactivated_at = True, True, None
+    archived_at = db_archived.archived_at
+    db.add(db_product)
+    await db.delete(db_archived)
+    await db.flush()
+
+    # reviews deleted and archived before the product are restored one by one:
+    # the user could have written a new review of the product since then
+    moved_reviews, inserted_reviews = _move_rows(
+        ReviewArchiveModel, ReviewModel, REVIEW_COLUMNS,
+        (ReviewArchiveModel.product_id == product_id) & (ReviewArchiveModel.archived_at == archived_at),
+        'reviews')
+    is_active = moved_reviews.c.is_active == True
+    reviews_count, grades_sum = (await db.execute(
+        select(func.count().filter(is_active), func.coalesce(func.sum(moved_reviews.c.grade).filter(is_active), 0))
+        .add_cte(inserted_reviews)
+    )).one()
+
+    stats_delta = product_stats_delta(None, (True, db_product.stock))
+    stats_delta.update(reviews_count=reviews_count, grades_sum=grades_sum)
+    await apply_seller_stats_delta(db_product.seller_id, stats_delta, db)
+    await notify_product_changed(db_product.id, db)
+    await notify_product_event('created', db_product, db)
+    await db.commit()
+    invalidate_categories_tree_cache(products_count_only=True)
+    return db_product
@@ -1,21 +1,36 @@
+import time
+
 from fastapi import HTTPException, status
-from sqlalchemy import select, update
+from pydantic import TypeAdapter
+from sqlalchemy import select, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.generation_cache import GenerationCache
+from app.models import Category as CategoryModel, Product as ProductModel
+from app.notifications import add_notification_handler, notify
+from app.product_cache import product_cache, notify_product_changed, PRODUCT_CACHE_CHANNEL
+from app.product_events import notify_products_events
+from app.schemas import CategoryCreate, CategoryTree as CategoryTreeSchema
+from app.statements import active_categories_stmt, active_category_by_id_stmt
+
+CATEGORIES_CHANNEL = 'categories'
 
-from app.models import Category as CategoryModel
-from app.schemas import CategoryCreate
+categories_tree_adapter = TypeAdapter(list[CategoryTreeSchema])
+
+CATEGORIES_TREE_CACHE_TTL_SECONDS = 60
+
+# Serialized category trees, keyed by "with products count" flag
+_categories_tree_cache = GenerationCache(maxsize=2, ttl_seconds=CATEGORIES_TREE_CACHE_TTL_SECONDS)
 
 
 async def get_categories_from_db(db: AsyncSession):
-    categories_stmt = select(CategoryModel).where(CategoryModel.is_active == True)
-    categories = (await db.scalars(categories_stmt)).all()
+    categories = (await db.scalars(active_categories_stmt)).all()
     return categories
 
 
 async def get_category_by_id(category_id, db: AsyncSession):
-    categories_stmt = select(CategoryModel).where(CategoryModel.id == category_id,
-                                       CategoryModel.is_active == True)
-    db_category = (await db.scalars(categories_stmt)).first()
+    db_category = (await db.scalars(active_category_by_id_stmt, {'category_id': category_id})).first()
     if db_category is None:
         raise HTTPException(status_code=404,
                             detail="Category not found or inactive")
@@ -23,9 +38,7 @@ async def get_category_by_id(category_id, db: AsyncSession):
 
 
 async def check_category_by_id(category_id: int, db: AsyncSession) -> None:
-    categories_stmt = select(CategoryModel).where(CategoryModel.id == category_id,
-                                                CategoryModel.is_active == True)
-    db_category = (await db.scalars(categories_stmt)).first()
+    db_category = (await db.scalars(active_category_by_id_stmt, {'category_id': category_id})).first()
     if db_category is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail='Category not found or inactive')
@@ -34,8 +47,9 @@ async def check_category_by_id(category_id: int, db: AsyncSession) -> None:
 async def create_and_get_category(category: CategoryCreate, db: AsyncSession):
     db_category = CategoryModel(**category.model_dump())
     db.add(db_category)
+    await notify_categories_changed(db)
     await db.commit()
-    await db.refresh(db_category)
+    invalidate_categories_tree_cache()
     return db_category
 
 
@@ -43,23 +57,178 @@ async def update_and_get_category(category_id: int, category: CategoryCreate, db
     db_category = await get_category_by_id(category_id, db)
     if category.parent_id is not None:
         await check_category_by_id(category.parent_id, db)
+        await check_parent_outside_subtree(category_id, category.parent_id, db)
 
     await db.execute(update(CategoryModel)
                .where(CategoryModel.id == category_id)
                .values(**category.model_dump())
                )
-
+    await notify_categories_changed(db)
     await db.commit()
-    await db.refresh(db_category)
+    invalidate_categories_tree_cache()
     return db_category
 
 
-async def delete_and_get_category(db_category: CategoryModel, db: AsyncSession):
+def get_category_subtree_ids(category_id: int, active_only: bool = False):
+    """Select ids of category and all its subcategories (recursive CTE)
+
+    active_only: descend through active subcategories only, i.e. the part of subtree
+    that is visible when the category is. UNION (not UNION ALL) ends the recursion
+    even if a parent cycle was ever written.
+    """
+    subtree = (select(CategoryModel.id)
+               .where(CategoryModel.id == category_id)
+               .cte(name='category_subtree', recursive=True))
+    children = select(CategoryModel.id).where(CategoryModel.parent_id == subtree.c.id)
+    if active_only:
+        children = children.where(CategoryModel.is_active == True)
+    subtree = subtree.union(children)
+    return select(subtree.c.id)
+
+
+async def check_parent_outside_subtree(category_id: int, parent_id: int, db: AsyncSession) -> None:
+    """Category can't be moved under itself or its subcategory: the tree would get a cycle"""
+    subtree_ids = get_category_subtree_ids(category_id).subquery()
+    in_subtree = (await db.execute(select(subtree_ids.c.id).where(subtree_ids.c.id == parent_id))).first()
+    if in_subtree is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail='Category can not be moved into its own subtree')
+
+
+async def deactivate_category_subtree(category_id: int, db: AsyncSession) -> None:
+    """Set is_active=False of category subtree and hide its products by two set-based updates
+
+    Categories deactivated by this cascade are marked with category_id, the ones that were
+    already inactive keep their own mark. SSE clients get 'deleted' event of every hidden product.
+    """
     await db.execute(update(CategoryModel)
-               .where(CategoryModel.id == db_category.id,
-                      CategoryModel.is_active == True)
-               .values(is_active=False)
-               )
+                     .where(CategoryModel.id.in_(get_category_subtree_ids(category_id)),
+                            CategoryModel.is_active == True)
+                     .values(is_active=False, deactivated_by_id=category_id)
+                     .execution_options(synchronize_session=False)
+                     )
+    hidden = (update(ProductModel)
+              .where(ProductModel.category_id.in_(get_category_subtree_ids(category_id)),
+                     ProductModel.is_visible == True)
+              .values(is_visible=False)
+              .returning(ProductModel.id, ProductModel.category_id, ProductModel.price, ProductModel.stock)
+              .cte('hidden_products'))
+    await notify_products_events('deleted', hidden, db)
+    await notify_categories_changed(db)
+    await notify_product_changed(None, db)
+
+
+async def activate_category_subtree(category_id: int, db: AsyncSession) -> None:
+    """Set is_active=True of category and subcategories deactivated by its cascade, show their products
+
+    Subcategories deleted on their own before stay inactive with their products hidden.
+    SSE clients get 'created' event of every product shown again.
+    """
+    await db.execute(update(CategoryModel)
+                     .where(CategoryModel.id.in_(get_category_subtree_ids(category_id)),
+                            (CategoryModel.id == category_id) | (CategoryModel.deactivated_by_id == category_id))
+                     .values(is_active=True, deactivated_by_id=None)
+                     .execution_options(synchronize_session=False)
+                     )
+    changed = (update(ProductModel)
+               .where(ProductModel.category_id.in_(get_category_subtree_ids(category_id, active_only=True)),
+                      ProductModel.is_visible != ProductModel.is_active)
+               .values(is_visible=ProductModel.is_active)
+               .returning(ProductModel.id, ProductModel.category_id, ProductModel.price, ProductModel.stock,
+                          ProductModel.is_visible)
+               .cte('changed_products'))
+    await notify_products_events('created', changed, db, changed.c.is_visible == True)
+    await notify_categories_changed(db)
+    await notify_product_changed(None, db)
+
+
+async def delete_and_get_category(db_category: CategoryModel, db: AsyncSession):
+    """Set is_active=False of category with its subcategories and hide their products"""
+    await deactivate_category_subtree(db_category.id, db)
     await db.commit()
-    await db.refresh(db_category)
+    invalidate_categories_tree_cache()
+    await product_cache.invalidate(None)
+    set_committed_value(db_category, 'is_active', False)
     return db_category
+
+
+async def activate_and_get_category(category_id: int, db: AsyncSession):
+    """Set is_active=True of category with subcategories deactivated by its delete and show their products"""
+    db_category = await db.get(CategoryModel, category_id)
+    if db_category is None:
+        raise HTTPException(status_code=404,
+                            detail="Category not found")
+    if db_category.parent_id is not None:
+        await check_category_by_id(db_category.parent_id, db)
+
+    await activate_category_subtree(category_id, db)
+    await db.commit()
+    invalidate_categories_tree_cache()
+    await product_cache.invalidate(None)
+    set_committed_value(db_category, 'is_active', True)
+    return db_category
+
+
+async def notify_categories_changed(db: AsyncSession) -> None:
+    """Tell all workers on commit that categories are changed"""
+    await notify(CATEGORIES_CHANNEL, str(time.time()), db)
+
+
+def invalidate_categories_tree_cache(products_count_only: bool = False) -> None:
+    """Drop cached category trees (only the ones with products count if requested)"""
+    if products_count_only:
+        _categories_tree_cache.invalidate(True)
+    else:
+        _categories_tree_cache.clear()
+
+
+def build_categories_tree(categories, products_counts: dict[int, int] | None = None):
+    """Build nested tree from flat categories list in one pass by parent_id"""
+    nodes = {
+        category.id: CategoryTreeSchema(
+            id=category.id,
+            name=category.name,
+            parent_id=category.parent_id,
+            products_count=None if products_counts is None else products_counts.get(category.id, 0)
+        )
+        for category in categories
+    }
+    roots = []
+    for node in nodes.values():
+        if node.parent_id is None:
+            roots.append(node)
+        elif node.parent_id in nodes:
+            nodes[node.parent_id].children.append(node)
+        # parent is inactive -> the whole branch is hidden
+    return roots
+
+
+async def get_categories_tree_json(db: AsyncSession, with_products_count: bool = False) -> bytes:
+    """Get serialized tree of active categories (cached until a category is changed or TTL expires)"""
+    cached = _categories_tree_cache.get(with_products_count)
+    if cached is not None:
+        return cached
+
+    generation = _categories_tree_cache.generation
+    if with_products_count:
+        products_count = (select(func.count(ProductModel.id))
+                          .where(ProductModel.category_id == CategoryModel.id,
+                                 ProductModel.is_visible == True)
+                          .correlate(CategoryModel)
+                          .scalar_subquery())
+        rows = (await db.execute(select(CategoryModel, products_count)
+                                 .where(CategoryModel.is_active == True))).all()
+        categories = [category for category, _ in rows]
+        products_counts = {category.id: count for category, count in rows}
+    else:
+        categories = (await db.scalars(active_categories_stmt)).all()
+        products_counts = None
+
+    tree_json = categories_tree_adapter.dump_json(build_categories_tree(categories, products_counts))
+    _categories_tree_cache.set(with_products_count, tree_json, generation)
+    return tree_json
+
+
+add_notification_handler(CATEGORIES_CHANNEL, lambda payload: invalidate_categories_tree_cache())
+add_notification_handler(PRODUCT_CACHE_CHANNEL,
+                         lambda payload: invalidate_categories_tree_cache(products_count_only=True))
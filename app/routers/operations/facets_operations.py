@@ -0,0 +1,119 @@
+from decimal import Decimal
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, func, cast, null, literal_column, tuple_, bindparam, column, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.generation_cache import GenerationCache
+from app.models import Product as ProductModel, Category as CategoryModel
+from app.notifications import add_notification_handler
+from app.product_cache import PRODUCT_CACHE_CHANNEL
+from app.product_events import PRODUCT_EVENTS_CHANNEL
+from app.routers.operations.categories_operations import CATEGORIES_CHANNEL
+from app.schemas import ProductFacets as ProductFacetsSchema
+from app.statements import product_in_stock
+
+PRICE_BUCKET_BOUNDS = (Decimal(10), Decimal(50), Decimal(100), Decimal(500), Decimal(1000))
+FACETS_CACHE_SIZE = 1000  # categories
+FACETS_CACHE_TTL_SECONDS = 300
+
+# Serialized facets keyed by category id (None for the whole catalog)
+_facets_cache = GenerationCache(maxsize=FACETS_CACHE_SIZE, ttl_seconds=FACETS_CACHE_TTL_SECONDS)
+
+
+def invalidate_facets_cache(payload: str | None = None) -> None:
+    """Drop cached facets of all categories (any product write can move it between buckets)"""
+    _facets_cache.clear()
+
+
+def get_facets_subtree_stmt(category_id: int | None):
+    """Active categories of subtree (whole catalog for None) with the direct subcategory each one is in
+
+    Category itself is paired with its own id, subcategories of the catalog are roots.
+    UNION: recursion ends even if a parent cycle was ever written.
+    """
+    if category_id is None:
+        seed = (select(CategoryModel.id, CategoryModel.id.label('child_id'))
+                .where(CategoryModel.parent_id.is_(None), CategoryModel.is_active == True))
+    else:
+        seed = (select(CategoryModel.id, cast(null(), Integer).label('child_id'))
+                .where(CategoryModel.id == category_id, CategoryModel.is_active == True))
+    subtree = seed.cte(name='facets_subtree', recursive=True)
+    subtree = subtree.union(select(CategoryModel.id, func.coalesce(subtree.c.child_id, CategoryModel.id))
+                            .where(CategoryModel.parent_id == subtree.c.id, CategoryModel.is_active == True))
+    return select(subtree.c.id, func.coalesce(subtree.c.child_id, subtree.c.id))
+
+
+def get_facets_stmt(category_ids: list[int], child_ids: list[int]):
+    """Counts of visible in-stock products of categories by subcategory, price and rating bucket
+
+    Categories are passed as arrays instead of a recursive CTE: the planner sees their real number
+    and reads a small subtree by index. One scan grouped by GROUPING SETS: grand total,
+    direct subcategory (the subtree product belongs to), price bucket and whole stars of rating.
+    """
+    subtree = (func.unnest(bindparam('category_ids', category_ids, type_=ARRAY(Integer)),
+                           bindparam('child_ids', child_ids, type_=ARRAY(Integer)))
+               .table_valued(column('id', Integer), column('child_id', Integer))
+               .render_derived(name='facets_subtree'))
+
+    child_id = subtree.c.child_id
+    # literal bounds: a bound parameter would make the expression in GROUP BY differ from the one in SELECT
+    bounds = literal_column(f"ARRAY[{', '.join(str(bound) for bound in PRICE_BUCKET_BOUNDS)}]::numeric[]")
+    price_bucket = func.width_bucket(ProductModel.price, bounds)
+    rating_bucket = cast(func.floor(ProductModel.rating), Integer)
+    return (select(child_id, price_bucket, rating_bucket,
+                   func.grouping(child_id, price_bucket, rating_bucket), func.count())
+            .join_from(ProductModel, subtree, ProductModel.category_id == subtree.c.id)
+            .where(ProductModel.is_visible == True, product_in_stock)
+            .group_by(func.grouping_sets(tuple_(), child_id, price_bucket, rating_bucket)))
+
+
+def build_facets(category_id: int | None, rows) -> ProductFacetsSchema:
+    """Split grouping sets rows by grouping() bitmask (bit is set for aggregated column)"""
+    total, subcategories, prices, ratings = 0, [], [], []
+    for child_id, price_bucket, rating_bucket, grouping, count in rows:
+        if grouping == 0b111:
+            total = count
+        elif grouping == 0b011:
+            if child_id != category_id:  # products of category itself
+                subcategories.append({'category_id': child_id, 'count': count})
+        elif grouping == 0b101:
+            prices.append({
+                'min_price': PRICE_BUCKET_BOUNDS[price_bucket - 1] if price_bucket > 0 else Decimal(0),
+                'max_price': PRICE_BUCKET_BOUNDS[price_bucket] if price_bucket < len(PRICE_BUCKET_BOUNDS) else None,
+                'count': count,
+            })
+        elif grouping == 0b110:
+            ratings.append({'rating': rating_bucket, 'count': count})
+    return ProductFacetsSchema(category_id=category_id,
+                               total=total,
+                               subcategories=sorted(subcategories, key=lambda facet: facet['category_id']),
+                               prices=sorted(prices, key=lambda facet: facet['min_price']),
+                               ratings=sorted(ratings, key=lambda facet: facet['rating']))
+
+
+async def get_facets_json(category_id: int | None, db: AsyncSession) -> bytes:
+    """Get serialized facets of category (cached until products or categories of the catalog change)"""
+    cached = _facets_cache.get(category_id)
+    if cached is not None:
+        return cached
+
+    generation = _facets_cache.generation
+    subtree = (await db.execute(get_facets_subtree_stmt(category_id))).all()
+    if category_id is not None and not subtree:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail='Category not found or inactive')
+    category_ids = [row[0] for row in subtree]
+    child_ids = [row[1] for row in subtree]
+    rows = (await db.execute(get_facets_stmt(category_ids, child_ids))).all() if subtree else []
+    facets_json = build_facets(category_id, rows).model_dump_json().encode()
+    _facets_cache.set(category_id, facets_json, generation)
+    return facets_json
+
+
+# product writes (rating updates by reviews included) and category writes (visibility cascades included)
+# of any worker
+add_notification_handler(PRODUCT_EVENTS_CHANNEL, invalidate_facets_cache)
+add_notification_handler(PRODUCT_CACHE_CHANNEL, invalidate_facets_cache)
+add_notification_handler(CATEGORIES_CHANNEL, invalidate_facets_cache)
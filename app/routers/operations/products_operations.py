@@ -1,30 +1,67 @@
 from fastapi import HTTPException, status
-from sqlalchemy import select, update
+from sqlalchemy import select, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.models import Product as ProductModel, Category as CategoryModel, User as UserModel
-from app.routers.operations.categories_operations import check_category_by_id
-from app.schemas import ProductCreate
+from app.models import Product as ProductModel, User as UserModel
+from app.product_cache import product_cache, notify_product_changed
+from app.product_events import notify_product_event
+from app.routers.operations.categories_operations import check_category_by_id, invalidate_categories_tree_cache
+from app.routers.operations.seller_stats_operations import apply_seller_stats_delta, product_stats_delta, \
+    LOW_STOCK_THRESHOLD
+from app.schemas import ProductCreate, Product as ProductSchema
+from app.statements import active_product_by_id_stmt, visible_product_by_id_stmt, visible_in_stock_products_stmt, \
+    visible_category_products_stmt, trending_products_stmt
 
 
 async def get_products_from_db(db: AsyncSession, category_id: int | None = None):
     """get all products or get products of category by ID"""
     if category_id is not None:
         await check_category_by_id(category_id, db)
-        products_stmt = select(ProductModel).where(ProductModel.category_id == category_id,
-                                          ProductModel.is_active == True)
+        products = (await db.scalars(visible_category_products_stmt, {'category_id': category_id})).all()
     else:
-        products_stmt = select(ProductModel).join(CategoryModel).where(ProductModel.is_active == True,
-                                                              CategoryModel.is_active == True,
-                                                              ProductModel.stock > 0)
+        products = (await db.scalars(visible_in_stock_products_stmt)).all()
+    return products
+
+
+async def get_trending_products_from_db(db: AsyncSession, limit: int):
+    """get visible products with the most recent views"""
+    products = (await db.scalars(trending_products_stmt, {'limit': limit})).all()
+    return products
+
+
+async def get_seller_products_from_db(seller_id: int, db: AsyncSession, low_stock: bool = False):
+    """get active products of seller (only with low stock if requested)"""
+    products_stmt = select(ProductModel).where(ProductModel.seller_id == seller_id,
+                                               ProductModel.is_active == True)
+    if low_stock:
+        products_stmt = products_stmt.where(ProductModel.stock <= LOW_STOCK_THRESHOLD)
     products = (await db.scalars(products_stmt)).all()
     return products
 
 
+async def get_visible_product_by_id(product_id: int, db: AsyncSession):
+    """get active product of active category in one query"""
+    db_product = (await db.scalars(visible_product_by_id_stmt, {'product_id': product_id})).first()
+    if db_product is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                      detail='Product not found or inactive')
+    return db_product
+
+
+async def get_product_json(product_id: int, db: AsyncSession) -> bytes:
+    """get serialized visible product from cache or db"""
+    product_json = await product_cache.get(product_id)
+    if product_json is None:
+        generation = product_cache.generation
+        db_product = await get_visible_product_by_id(product_id, db)
+        product_json = ProductSchema.model_validate(db_product).model_dump_json().encode()
+        await product_cache.set(product_id, product_json, generation)
+    return product_json
+
+
 async def get_product_by_id(product_id: int, db: AsyncSession):
-    products_stmt = select(ProductModel).where(ProductModel.id == product_id,
-                                      ProductModel.is_active == True)
-    db_product = (await db.scalars(products_stmt)).first()
+    db_product = (await db.scalars(active_product_by_id_stmt, {'product_id': product_id})).first()
     if db_product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                       detail='Product not found or inactive')
@@ -36,23 +73,59 @@ async def create_and_get_product(product: ProductCreate,
                                  current_seller: UserModel):
     db_product = ProductModel(**product.model_dump(), seller_id=current_seller.id)
     db.add(db_product)
+    await db.flush()  # id for notifications
+    await apply_seller_stats_delta(current_seller.id,
+                                   product_stats_delta(None, (True, product.stock)),
+                                   db)
+    await notify_product_changed(db_product.id, db)
+    await notify_product_event('created', db_product, db)
     await db.commit()
-    await db.refresh(db_product)
+    invalidate_categories_tree_cache(products_count_only=True)
     return db_product
 
 
 async def update_and_get_product(db_product,
                                  product: ProductCreate,
                                  db: AsyncSession):
-    await db.execute(update(ProductModel)
-               .where(ProductModel.id == db_product.id)
-               .values(**product.model_dump())
-               )
+    """update product, stats delta is taken from the row as it was changed, not from db_product"""
+    # locked row before the update: a concurrent update is waited for and its result is the old value
+    old_product = (select(ProductModel.id, ProductModel.stock, ProductModel.category_id)
+                   .where(ProductModel.id == db_product.id, ProductModel.is_active == True)
+                   .with_for_update()
+                   .subquery('old_product'))
+    changed = (await db.execute(update(ProductModel)
+                                .where(ProductModel.id == old_product.c.id)
+                                .values(**product.model_dump())
+                                .returning(old_product.c.stock, old_product.c.category_id, ProductModel.stock)
+                                .execution_options(synchronize_session=False)
+                                )).first()
+    if changed is None:  # deleted concurrently
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail='Product not found or inactive')
+    old_stock, previous_category_id, new_stock = changed
+    for field, value in product.model_dump().items():
+        set_committed_value(db_product, field, value)
+    await apply_seller_stats_delta(db_product.seller_id,
+                                   product_stats_delta((True, old_stock), (True, new_stock)),
+                                   db)
+    await notify_product_changed(db_product.id, db)
+    await notify_product_event('updated', db_product, db, previous_category_id)
     await db.commit()
-    await db.refresh(db_product)
+    invalidate_categories_tree_cache(products_count_only=True)
+    await product_cache.invalidate(db_product.id)
     return db_product
 
 
+async def set_product_image_url(db_product, image_url: str, db: AsyncSession) -> None:
+    await db.execute(update(ProductModel)
+                     .where(ProductModel.id == db_product.id)
+                     .values(image_url=image_url)
+                     )
+    await notify_product_changed(db_product.id, db)
+    await db.commit()
+    await product_cache.invalidate(db_product.id)
+
+
 async def check_product_seller(product, current_seller: UserModel):
     """does current seller own product"""
     if product.seller_id != current_seller.id:
@@ -61,13 +134,25 @@ async def check_product_seller(product, current_seller: UserModel):
 
 
 async def delete_and_get_product(db_product, db: AsyncSession):
-    await db.execute(update(ProductModel)
-               .where(ProductModel.id == db_product.id,
-                      ProductModel.is_active == True)
-               .values(is_active=False)
-               )
+    """deactivate product, stats delta is applied only by the request that changed the row"""
+    deleted = (await db.execute(update(ProductModel)
+                                .where(ProductModel.id == db_product.id,
+                                       ProductModel.is_active == True)
+                                .values(is_active=False, is_visible=False, deactivated_at=func.now())
+                                .returning(ProductModel.stock)
+                                .execution_options(synchronize_session=False)
+                                )).first()
+    if deleted is None:  # deleted concurrently
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail='Product not found or inactive')
+    set_committed_value(db_product, 'is_active', False)
+    set_committed_value(db_product, 'is_visible', False)
+    await apply_seller_stats_delta(db_product.seller_id, product_stats_delta((True, deleted.stock), None), db)
+    await notify_product_changed(db_product.id, db)
+    await notify_product_event('deleted', db_product, db)
     await db.commit()
-    await db.refresh(db_product)
+    invalidate_categories_tree_cache(products_count_only=True)
+    await product_cache.invalidate(db_product.id)
     return db_product
 
 
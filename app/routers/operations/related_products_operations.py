@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select, delete, insert, func, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+from app.models import ProductRelated as ProductRelatedModel, JobWatermark as JobWatermarkModel, \
+    Review as ReviewModel
+from app.statements import related_products_stmt
+
+logger = logging.getLogger(__name__)
+
+RELATED_PRODUCTS_TOP_K = 10
+RELATED_PRODUCTS_INTERVAL_MINUTES = 5  # new reviews are taken into account after at most this
+RELATED_PRODUCTS_REBUILD_INTERVAL_HOURS = 24  # full rebuild drops pairs of deleted reviews
+RELATED_PRODUCTS_CHUNK_ROWS = 10_000  # products per sparse matrix product, bounds memory of co-review counts
+RELATED_PRODUCTS_LOCK_ID = 28_002  # pg advisory lock, one update at a time across workers
+# watermarks: the last processed review id and the time of the last full rebuild
+# (reviews committed late with lower ids than watermark are taken by the next full rebuild)
+INCREMENTAL_WATERMARK, REBUILD_WATERMARK = 'product_related', 'product_related_rebuild'
+
+
+async def get_related_products_from_db(product_id: int, db: AsyncSession):
+    """get visible related products of product in one indexed lookup"""
+    products = (await db.scalars(related_products_stmt, {'product_id': product_id})).all()
+    return products
+
+
+def compute_related_products(user_ids, product_ids, for_product_ids=None, reviewers_counts: dict | None = None,
+                             top_k: int = RELATED_PRODUCTS_TOP_K) -> list[dict]:
+    """Top co-reviewed products by cosine similarity of their reviewers (all products or for_product_ids)
+
+    For for_product_ids it's enough to pass the reviews of their reviewers with reviewers_counts
+    (all reviewers by product id) of every product in them.
+    """
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    products, product_index = np.unique(product_ids, return_inverse=True)
+    reviews = sparse.csr_matrix((np.ones(len(user_index), dtype=np.float32), (user_index, product_index)),
+                                shape=(len(users), len(products)))
+    if reviewers_counts is None:
+        reviewers_count = np.asarray(reviews.sum(axis=0)).ravel()
+    else:
+        reviewers_count = np.fromiter((reviewers_counts[product_id] for product_id in products.tolist()),
+                                      dtype=np.float32, count=len(products))
+    reviews_by_product = reviews.T.tocsr()
+
+    if for_product_ids is None:
+        rows = np.arange(len(products))
+    else:
+        rows = np.flatnonzero(np.isin(products, for_product_ids))
+
+    related = []
+    for chunk_start in range(0, len(rows), RELATED_PRODUCTS_CHUNK_ROWS):
+        chunk = rows[chunk_start:chunk_start + RELATED_PRODUCTS_CHUNK_ROWS]
+        co_reviews = (reviews_by_product[chunk] @ reviews).tocsr()  # chunk x products: common reviewers
+        for row_number, row in enumerate(chunk):
+            start, end = co_reviews.indptr[row_number], co_reviews.indptr[row_number + 1]
+            neighbours = co_reviews.indices[start:end]
+            common = co_reviews.data[start:end]
+            not_self = neighbours != row
+            neighbours, common = neighbours[not_self], common[not_self]
+            if not len(neighbours):
+                continue
+            scores = common / np.sqrt(reviewers_count[row] * reviewers_count[neighbours])
+            if len(scores) > top_k:
+                top = np.argpartition(-scores, top_k)[:top_k]
+                neighbours, scores = neighbours[top], scores[top]
+            order = np.lexsort((products[neighbours], -scores))  # best score first, then lower id
+            related.extend({'product_id': int(products[row]), 'rank': rank,
+                            'related_product_id': int(products[neighbours[i]]), 'score': float(scores[i])}
+                           for rank, i in enumerate(order, start=1))
+    return related
+
+
+async def get_watermarks(db: AsyncSession) -> dict[str, tuple[int, datetime]]:
+    return {watermark.name: (watermark.last_id, watermark.updated_at) for watermark in (await db.scalars(
+        select(JobWatermarkModel)
+        .where(JobWatermarkModel.name.in_([INCREMENTAL_WATERMARK, REBUILD_WATERMARK]))
+    )).all()}
+
+
+async def update_related_products(db: AsyncSession) -> bool:
+    """Recalculate related products of products co-reviewed with new reviews (all of them once a day)
+
+    Reviews are read in one short transaction and similarities are computed with no transaction open.
+    Results are written in another transaction, unless a concurrent run has moved the watermarks meanwhile.
+    """
+    got_lock = (await db.execute(select(func.pg_try_advisory_xact_lock(RELATED_PRODUCTS_LOCK_ID)))).scalar()
+    if not got_lock:
+        return False
+
+    watermarks = await get_watermarks(db)
+    now = datetime.now()
+    rebuild = watermarks.get(REBUILD_WATERMARK)
+    full = rebuild is None or rebuild[1] < now - timedelta(hours=RELATED_PRODUCTS_REBUILD_INTERVAL_HOURS)
+    last_id = 0 if full or INCREMENTAL_WATERMARK not in watermarks else watermarks[INCREMENTAL_WATERMARK][0]
+    max_id = (await db.execute(select(func.coalesce(func.max(ReviewModel.id), 0)))).scalar()
+    if not full and max_id <= last_id:
+        await db.commit()
+        return True
+
+    is_active = (ReviewModel.is_active == True) & (ReviewModel.id <= max_id)
+    if full:
+        for_product_ids = reviewers_counts = None
+        reviews = (await db.execute(select(ReviewModel.user_id, ReviewModel.product_id).where(is_active))).all()
+    else:
+        # new pairs change related products of both products of a pair: all products of new reviewers
+        new_reviewers = select(ReviewModel.user_id).where(ReviewModel.id > last_id, ReviewModel.id <= max_id)
+        for_product_ids = (await db.scalars(select(ReviewModel.product_id).distinct()
+                                            .where(is_active, ReviewModel.user_id.in_(new_reviewers)))).all()
+        affected_ids = bindparam('affected_ids', for_product_ids, type_=ARRAY(Integer))  # one parameter of any size
+        # similarities of affected products need only the reviews of their reviewers
+        # and the reviewers count of every product those reviewers have reviewed
+        co_reviewers = select(ReviewModel.user_id).where(is_active, ReviewModel.product_id == any_(affected_ids))
+        reviews = (await db.execute(select(ReviewModel.user_id, ReviewModel.product_id)
+                                    .where(is_active, ReviewModel.user_id.in_(co_reviewers)))).all()
+        co_reviewed = select(ReviewModel.product_id).where(is_active, ReviewModel.user_id.in_(co_reviewers))
+        reviewers_counts = dict((await db.execute(select(ReviewModel.product_id, func.count())
+                                                  .where(is_active, ReviewModel.product_id.in_(co_reviewed))
+                                                  .group_by(ReviewModel.product_id))).all())
+    await db.commit()  # releases the lock and the snapshot for the computation
+
+    user_ids = np.fromiter((user_id for user_id, _ in reviews), dtype=np.int64, count=len(reviews))
+    product_ids = np.fromiter((product_id for _, product_id in reviews), dtype=np.int64, count=len(reviews))
+    related = await asyncio.to_thread(compute_related_products, user_ids, product_ids, for_product_ids,
+                                      reviewers_counts)
+
+    got_lock = (await db.execute(select(func.pg_try_advisory_xact_lock(RELATED_PRODUCTS_LOCK_ID)))).scalar()
+    if not got_lock or await get_watermarks(db) != watermarks:  # another run is writing or has written
+        await db.rollback()
+        return False
+    if full:
+        await db.execute(delete(ProductRelatedModel))
+    else:
+        await db.execute(delete(ProductRelatedModel).where(ProductRelatedModel.product_id == any_(affected_ids)))
+    if related:
+        await db.execute(insert(ProductRelatedModel), related)
+
+    updated = [{'name': INCREMENTAL_WATERMARK, 'last_id': max_id, 'updated_at': now}]
+    if full:
+        updated.append({'name': REBUILD_WATERMARK, 'last_id': max_id, 'updated_at': now})
+    watermarks_stmt = pg_insert(JobWatermarkModel).values(updated)
+    await db.execute(watermarks_stmt.on_conflict_do_update(
+        index_elements=[JobWatermarkModel.name],
+        set_={'last_id': watermarks_stmt.excluded.last_id, 'updated_at': watermarks_stmt.excluded.updated_at}
+    ))
+    await db.commit()
+    logger.info("Related products of %s products are updated",
+                'all' if full else len(for_product_ids))
+    return True
+
+
+async def run_related_products_job() -> None:
+    """Update related products periodically"""
+    while True:
+        try:
+            async with async_session_maker() as db:
+                await update_related_products(db)
+        except Exception:
+            logger.exception("Related products update failed")
+        await asyncio.sleep(RELATED_PRODUCTS_INTERVAL_MINUTES * 60)
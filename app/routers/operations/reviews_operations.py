@@ -1,7 +1,11 @@
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 from app.models import Review as ReviewModel, User as UserModel, Product as ProductModel
+from app.product_cache import product_cache, notify_product_changed
+from app.routers.operations.seller_stats_operations import apply_seller_stats_delta, review_stats_delta
 from app.schemas import ReviewCreate
+from app.statements import active_reviews_stmt, active_product_reviews_stmt, active_review_by_id_stmt
 from sqlalchemy import select, update
 from sqlalchemy.sql import func
 
@@ -9,19 +13,14 @@ from sqlalchemy.sql import func
 async def get_reviews_from_db(db: AsyncSession, product_id: int | None = None):
     """get all reviews or get reviews of product by ID"""
     if product_id is None:
-        reviews_stmt = select(ReviewModel).where(ReviewModel.is_active == True)
+        reviews = (await db.scalars(active_reviews_stmt)).all()
     else:
-        reviews_stmt = select(ReviewModel).where(ReviewModel.is_active == True,
-                                                 ReviewModel.product_id == product_id)
-
-    reviews = (await db.scalars(reviews_stmt)).all()
+        reviews = (await db.scalars(active_product_reviews_stmt, {'product_id': product_id})).all()
     return reviews
 
 
 async def get_review_by_id(review_id: int, db: AsyncSession):
-    review_stmt = select(ReviewModel).where(ReviewModel.id == review_id,
-                                            ReviewModel.is_active == True)
-    db_review = (await db.scalars(review_stmt)).first()
+    db_review = (await db.scalars(active_review_by_id_stmt, {'review_id': review_id})).first()
     if db_review is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Review not found or inactive")
@@ -29,13 +28,14 @@ async def get_review_by_id(review_id: int, db: AsyncSession):
 
 
 async def create_and_get_review(review: ReviewCreate,
+                                db_product: ProductModel,
                                 db: AsyncSession,
                                 current_buyer: UserModel):
-    """create review and update its rating in db"""
+    """create review of the loaded product and update its rating in db"""
     db_review = ReviewModel(**review.model_dump(), user_id=current_buyer.id)
     db.add(db_review)
+    await apply_seller_stats_delta(db_product.seller_id, review_stats_delta(review.grade, 1), db)
     await update_product_rating(db_review.product_id, db)
-    await db.refresh(db_review)
     return db_review
 
 
@@ -51,25 +51,34 @@ async def check_admin_or_author(current_user: UserModel, db: AsyncSession):
 
 
 async def delete_and_get_review(db_review: ReviewModel, db: AsyncSession):
-    """delete review and update its rating in db"""
-    await db.execute(update(ReviewModel)
-                     .where(ReviewModel.id == db_review.id,
-                            ReviewModel.is_active == True)
-                     .values(is_active=False)
-                     )
+    """delete review and update its rating in db (stats delta only by the request that changed the row)"""
+    deleted = (await db.execute(update(ReviewModel)
+                                .where(ReviewModel.id == db_review.id,
+                                       ReviewModel.is_active == True)
+                                .values(is_active=False, deactivated_at=func.now())
+                                .returning(ReviewModel.grade)
+                                .execution_options(synchronize_session=False)
+                                )).first()
+    if deleted is None:  # deleted concurrently
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Review not found or inactive")
+    set_committed_value(db_review, 'is_active', False)
+    await apply_seller_stats_delta(db_review.product.seller_id, review_stats_delta(deleted.grade, -1), db)
     await update_product_rating(db_review.product_id, db)
-    await db.refresh(db_review)
     return db_review
 
 
 async def update_product_rating(product_id: int, db: AsyncSession):
-    result = await db.execute(
-        select(func.avg(ReviewModel.grade)).where(
-            ReviewModel.product_id == product_id,
-            ReviewModel.is_active == True
-        )
-    )
-    avg_rating = result.scalar() or 0.0
-    product = await db.get(ProductModel, product_id)
-    product.rating = avg_rating
+    """recalculate product rating from active reviews by one UPDATE and commit"""
+    avg_rating = (select(func.coalesce(func.avg(ReviewModel.grade), 0))
+                  .where(ReviewModel.product_id == product_id,
+                         ReviewModel.is_active == True)
+                  .scalar_subquery())
+    await db.execute(update(ProductModel)
+                     .where(ProductModel.id == product_id)
+                     .values(rating=avg_rating)
+                     .execution_options(synchronize_session=False)
+                     )
+    await notify_product_changed(product_id, db)
     await db.commit()
+    await product_cache.invalidate(product_id)
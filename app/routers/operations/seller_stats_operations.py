@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from decimal import Decimal
+
+from sqlalchemy import select, delete, func, bindparam, any_, Integer
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+from app.models import SellerStats as SellerStatsModel, Product as ProductModel, Review as ReviewModel
+from app.schemas import SellerStats as SellerStatsSchema
+
+logger = logging.getLogger(__name__)
+
+LOW_STOCK_THRESHOLD = 5
+SELLER_STATS_REBUILD_INTERVAL_MINUTES = 60
+SELLER_STATS_REBUILD_LOCK_ID = 28_001  # pg advisory lock, one rebuild at a time across workers
+
+
+def product_stats_delta(old: tuple[bool, int] | None, new: tuple[bool, int] | None) -> dict[str, int]:
+    """Get stats delta of product change by its (is_active, stock) before and after"""
+    delta = {'products_count': 0, 'total_stock': 0, 'low_stock_count': 0}
+    for state, sign in ((old, -1), (new, 1)):
+        if state is None or not state[0]:
+            continue
+        stock = state[1]
+        delta['products_count'] += sign
+        delta['total_stock'] += sign * stock
+        delta['low_stock_count'] += sign * (stock <= LOW_STOCK_THRESHOLD)
+    return delta
+
+
+def review_stats_delta(grade: int, sign: int) -> dict[str, int]:
+    """Get stats delta of review creating (sign=1) or deleting (sign=-1)"""
+    return {'reviews_count': sign, 'grades_sum': sign * grade}
+
+
+async def apply_seller_stats_delta(seller_id: int, delta: dict[str, int], db: AsyncSession) -> None:
+    """Add delta to seller stats in current transaction (single upsert)"""
+    if not any(delta.values()):
+        return
+    stats_stmt = insert(SellerStatsModel).values(seller_id=seller_id, updated_at=func.now(), **delta)
+    stats_stmt = stats_stmt.on_conflict_do_update(
+        index_elements=[SellerStatsModel.seller_id],
+        set_={
+            'updated_at': func.now(),
+            **{column: getattr(SellerStatsModel, column) + value for column, value in delta.items()}
+        }
+    )
+    await db.execute(stats_stmt)
+
+
+async def get_seller_stats(seller_id: int, db: AsyncSession) -> SellerStatsSchema:
+    db_stats = await db.get(SellerStatsModel, seller_id)
+    if db_stats is None:
+        return SellerStatsSchema()
+    average_rating = (Decimal(db_stats.grades_sum) / db_stats.reviews_count
+                      if db_stats.reviews_count else Decimal('0'))
+    return SellerStatsSchema(products_count=db_stats.products_count,
+                             total_stock=db_stats.total_stock,
+                             low_stock_count=db_stats.low_stock_count,
+                             reviews_count=db_stats.reviews_count,
+                             average_rating=average_rating.quantize(Decimal('0.01')))
+
+
+async def rebuild_seller_stats(db: AsyncSession) -> bool:
+    """Recalculate stats of all sellers from products and reviews (fixes drift of deltas)
+
+    Existing stats rows are locked before the aggregate: deltas of writers wait and are
+    applied on top of the rebuilt values, those committed before are seen by the aggregate.
+    Rows created by deltas meanwhile are left to them.
+    """
+    got_lock = (await db.execute(select(func.pg_try_advisory_xact_lock(SELLER_STATS_REBUILD_LOCK_ID)))).scalar()
+    if not got_lock:
+        return False
+    locked_ids = (await db.scalars(select(SellerStatsModel.seller_id)
+                                   .order_by(SellerStatsModel.seller_id)
+                                   .with_for_update())).all()
+    is_locked = SellerStatsModel.seller_id == any_(bindparam('locked_ids', list(locked_ids),
+                                                             type_=ARRAY(Integer)))
+
+    is_active = ProductModel.is_active == True
+    products_agg = (select(ProductModel.seller_id.label('seller_id'),
+                           func.count().filter(is_active).label('products_count'),
+                           func.coalesce(func.sum(ProductModel.stock).filter(is_active), 0).label('total_stock'),
+                           func.count().filter(is_active, ProductModel.stock <= LOW_STOCK_THRESHOLD)
+                           .label('low_stock_count'))
+                    .group_by(ProductModel.seller_id)
+                    .subquery())
+    reviews_agg = (select(ProductModel.seller_id.label('seller_id'),
+                          func.count(ReviewModel.id).label('reviews_count'),
+                          func.sum(ReviewModel.grade).label('grades_sum'))
+                   .join(ReviewModel, ReviewModel.product_id == ProductModel.id)
+                   .where(ReviewModel.is_active == True)
+                   .group_by(ProductModel.seller_id)
+                   .subquery())
+    stats_select = (select(products_agg.c.seller_id,
+                           products_agg.c.products_count,
+                           products_agg.c.total_stock,
+                           products_agg.c.low_stock_count,
+                           func.coalesce(reviews_agg.c.reviews_count, 0),
+                           func.coalesce(reviews_agg.c.grades_sum, 0),
+                           func.now())
+                    .outerjoin(reviews_agg, reviews_agg.c.seller_id == products_agg.c.seller_id))
+
+    columns = ['seller_id', 'products_count', 'total_stock', 'low_stock_count',
+               'reviews_count', 'grades_sum', 'updated_at']
+    stats_stmt = insert(SellerStatsModel).from_select(columns, stats_select)
+    stats_stmt = stats_stmt.on_conflict_do_update(
+        index_elements=[SellerStatsModel.seller_id],
+        set_={column: stats_stmt.excluded[column] for column in columns[1:]},
+        where=is_locked
+    )
+    await db.execute(stats_stmt)
+    await db.execute(delete(SellerStatsModel)
+                     .where(is_locked, SellerStatsModel.seller_id.not_in(select(ProductModel.seller_id)))
+                     )
+    await db.commit()
+    return True
+
+
+async def run_seller_stats_rebuild() -> None:
+    """Rebuild seller stats at startup and then periodically"""
+    while True:
+        try:
+            async with async_session_maker() as db:
+                await rebuild_seller_stats(db)
+        except Exception:
+            logger.exception("Seller stats rebuild failed")
+        await asyncio.sleep(SELLER_STATS_REBUILD_INTERVAL_MINUTES * 60)
@@ -5,9 +5,10 @@ from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import verify_password, hash_password
-from app.config import get_secret_key, ALGORITHM
+from app.jwt_cache import jwt_cache
 from app.models import User as UserModel
 from app.schemas import UserCreate
+from app.statements import active_user_by_id_stmt, active_user_by_email_stmt
 
 
 credentials_exception = HTTPException(status_code=401,
@@ -24,9 +25,7 @@ async def check_new_email(email, db: AsyncSession):
 
 
 async def get_user_by_id(user_id, db: AsyncSession):
-    user_stmt = select(UserModel).where(UserModel.id == user_id,
-                                        UserModel.is_active == True)
-    db_user = (await db.scalars(user_stmt)).first()
+    db_user = (await db.scalars(active_user_by_id_stmt, {'user_id': user_id})).first()
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="User not found or inactive")
@@ -34,9 +33,7 @@ async def get_user_by_id(user_id, db: AsyncSession):
 
 
 async def get_user_by_email(email, db: AsyncSession):
-    user_stmt = select(UserModel).where(UserModel.email == email,
-                                        UserModel.is_active == True)
-    db_user = (await db.scalars(user_stmt)).first()
+    db_user = (await db.scalars(active_user_by_email_stmt, {'email': email})).first()
 
     if db_user is None:
         raise credentials_exception
@@ -46,9 +43,7 @@ async def get_user_by_email(email, db: AsyncSession):
 
 async def authenticate_user(form_data: OAuth2PasswordRequestForm,
                             db: AsyncSession):
-    user_stmt = select(UserModel).where(UserModel.email == form_data.username,
-                                        UserModel.is_active == True)
-    db_user = (await db.scalars(user_stmt)).first()
+    db_user = (await db.scalars(active_user_by_email_stmt, {'email': form_data.username})).first()
     if db_user is None or not verify_password(form_data.password, db_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -65,7 +60,6 @@ async def create_and_get_user(user: UserCreate, db: AsyncSession):
                         role=user.role)
     db.add(db_user)
     await db.commit()
-    await db.refresh(db_user)
     return db_user
 
 
@@ -76,7 +70,6 @@ async def update_role_by_email_and_get_user(email: str, new_role: str, db: Async
                      .values(role=new_role)
                      )
     await db.commit()
-    await db.refresh(db_user)
     return db_user
 
 
@@ -87,14 +80,13 @@ async def update_role_by_id_and_get_user(user_id: int, new_role: str, db: AsyncS
                      .values(role=new_role)
                      )
     await db.commit()
-    await db.refresh(db_user)
     return db_user
 
 
 def get_id_by_refresh_token(refresh_token) -> int:
     """Check refresh token and return user_id"""
     try:
-        payload = jwt.decode(refresh_token, get_secret_key(), algorithms=[ALGORITHM])
+        payload = jwt_cache.decode(refresh_token)
         user_id: str | None = payload.get("id")
         token_type: str | None = payload.get("token_type")
         if user_id is None or token_type != "refresh":
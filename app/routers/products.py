@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response, Query, UploadFile, HTTPException, status
+from fastapi.responses import StreamingResponse
 
 from app.auth import get_current_seller
-from app.schemas import Product as ProductSchema, ProductCreate
+from app.autocomplete import autocomplete_index
+from app.images import image_processor, images_cfg
+from app.product_events import product_events
+from app.schemas import Product as ProductSchema, ProductCreate, AutocompleteSuggestion, ProductImage, ProductFacets
 from app.models.users import User as UserModel
 
 from app.routers.operations.products_operations import get_products_from_db, get_product_by_id, create_and_get_product, \
-    update_and_get_product, check_product_seller, delete_and_get_product
+    update_and_get_product, check_product_seller, delete_and_get_product, get_product_json, \
+    get_trending_products_from_db, set_product_image_url
+from app.view_counter import view_counter
+from app.routers.operations.related_products_operations import get_related_products_from_db
+from app.routers.operations.facets_operations import get_facets_json
 from app.routers.operations.categories_operations import check_category_by_id
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -35,17 +43,56 @@ async def create_product(product: ProductCreate,
 @router.get("/category/{category_id}", response_model=list[ProductSchema], status_code=200)
 async def get_products_by_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get all products from category by category_id"""
-    await check_category_by_id(category_id, db)
     products = await get_products_from_db(db, category_id)
     return products
 
 
+@router.get("/trending", response_model=list[ProductSchema], status_code=200)
+async def get_trending_products(limit: int = Query(default=20, ge=1, le=100),
+                                db: AsyncSession = Depends(get_async_db)):
+    """Get products ordered by views with time decay"""
+    return await get_trending_products_from_db(db, limit)
+
+
+@router.get("/autocomplete", response_model=list[AutocompleteSuggestion], status_code=200)
+async def autocomplete_products(prefix: str = Query(min_length=1, max_length=100),
+                                limit: int = Query(default=10, ge=1, le=50)):
+    """Get categories and best rated products with a name word starting with prefix"""
+    return autocomplete_index.search(prefix, limit)
+
+
+@router.get("/facets", response_model=ProductFacets, status_code=200)
+async def get_product_facets(category_id: int | None = None, db: AsyncSession = Depends(get_async_db)):
+    """Get counts of active in-stock products of category by subcategory, price and rating"""
+    facets_json = await get_facets_json(category_id, db)
+    return Response(content=facets_json, media_type='application/json')
+
+
+@router.get("/events", status_code=200)
+async def get_product_events(category_id: list[int] = Query(default=[], max_length=100),
+                             product_id: list[int] = Query(default=[], max_length=100)):
+    """Stream price and stock changes of products (of given categories or products if any) as SSE"""
+    subscriber = product_events.subscribe(set(category_id), set(product_id))
+    if subscriber is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail='Too many event stream clients, retry later',
+                            headers={'Retry-After': '5'})
+    return StreamingResponse(product_events.stream(subscriber), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @router.get("/{product_id}", response_model=ProductSchema, status_code=200)
 async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get details of product by id"""
-    db_product = await get_product_by_id(product_id, db)
-    await check_category_by_id(db_product.category_id, db)
-    return db_product
+    product_json = await get_product_json(product_id, db)
+    view_counter.record_view(product_id)
+    return Response(content=product_json, media_type='application/json')
+
+
+@router.get("/{product_id}/related", response_model=list[ProductSchema], status_code=200)
+async def get_related_products(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get products often reviewed by the same users as product by id"""
+    return await get_related_products_from_db(product_id, db)
 
 
 @router.put("/{product_id}", response_model=ProductSchema, status_code=200)
@@ -57,6 +104,8 @@ async def update_product(product_id: int,
     db_product = await get_product_by_id(product_id, db)
     await check_category_by_id(db_product.category_id, db)
     await check_product_seller(db_product, current_seller)
+    if product.category_id != db_product.category_id:
+        await check_category_by_id(product.category_id, db)
     return await update_and_get_product(db_product, product, db)
 
 
@@ -69,3 +118,21 @@ async def delete_product(product_id: int,
     await check_product_seller(db_product, current_seller)
     return await delete_and_get_product(db_product, db)
 
+
+@router.post("/{product_id}/image", response_model=ProductImage, status_code=201)
+async def upload_product_image(product_id: int,
+                               image: UploadFile,
+                               db: AsyncSession = Depends(get_async_db),
+                               current_seller: UserModel = Depends(get_current_seller)):
+    """Upload image of current seller's product, make its thumbnails and set product image_url"""
+    db_product = await get_product_by_id(product_id, db)
+    await check_product_seller(db_product, current_seller)
+    await db.commit()  # release db connection while image is processed
+
+    data = await image.read(images_cfg.MAX_UPLOAD_BYTES + 1)
+    if len(data) > images_cfg.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f'Image must be at most {images_cfg.MAX_UPLOAD_BYTES} bytes')
+    image_urls = await image_processor.ingest(data)
+    await set_product_image_url(db_product, image_urls['original'], db)
+    return {'product_id': product_id, **image_urls}
@@ -31,8 +31,8 @@ async def get_product_reviews(product_id: int, db: AsyncSession = Depends(get_as
 async def create_review(review: ReviewCreate,
                       db: AsyncSession = Depends(get_async_db),
                       current_buyer: UserModel = Depends(get_current_buyer)):
-    await get_product_by_id(review.product_id, db)
-    db_review = await create_and_get_review(review, db, current_buyer)
+    db_product = await get_product_by_id(review.product_id, db)
+    db_review = await create_and_get_review(review, db_product, db, current_buyer)
     return db_review
 
 
@@ -2,11 +2,14 @@ from fastapi import APIRouter, Depends, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth import get_current_admin, create_refresh_token, create_access_token
+from app.auth import get_current_admin, get_current_seller, create_refresh_token, create_access_token
 from app.routers.operations.users_operations import check_new_email, get_user_by_id, \
     authenticate_user, create_and_get_user, update_role_by_id_and_get_user, get_id_by_refresh_token
+from app.routers.operations.products_operations import get_seller_products_from_db
+from app.routers.operations.seller_stats_operations import get_seller_stats
 from app.models import User as UserModel
-from app.schemas import UserCreate, User as UserSchema, UserRoleUpdate, RefreshTokenRequest
+from app.schemas import UserCreate, User as UserSchema, UserRoleUpdate, RefreshTokenRequest, \
+    SellerStats as SellerStatsSchema, Product as ProductSchema
 from app.db_depends import get_async_db
 
 router = APIRouter(prefix='/users', tags=['users'])
@@ -53,6 +56,21 @@ async def tokens_by_refresh_token(body: RefreshTokenRequest, db: AsyncSession =
             "token_type": "bearer"}
 
 
+@router.get('/me/stats', response_model=SellerStatsSchema)
+async def get_my_stats(db: AsyncSession = Depends(get_async_db),
+                       current_seller: UserModel = Depends(get_current_seller)):
+    """Get dashboard aggregates of current seller"""
+    return await get_seller_stats(current_seller.id, db)
+
+
+@router.get('/me/products', response_model=list[ProductSchema])
+async def get_my_products(low_stock: bool = False,
+                          db: AsyncSession = Depends(get_async_db),
+                          current_seller: UserModel = Depends(get_current_seller)):
+    """Get active products of current seller"""
+    return await get_seller_products_from_db(current_seller.id, db, low_stock)
+
+
 @router.get('/{user_id}', response_model=UserSchema)
 async def get_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
     db_user = await get_user_by_id(user_id, db)
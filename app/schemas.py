@@ -1,5 +1,5 @@
 from decimal import Decimal
-from typing import Annotated
+from typing import Annotated, Literal
 from pydantic import BaseModel, Field, ConfigDict, EmailStr, SecretStr
 from datetime import datetime
 
@@ -228,3 +228,157 @@ class ReviewCreate(BaseModel):
         le=5,
         description="Review grade (from 1 to 5)"
     )]
+
+
+class CategoryTree(BaseModel):
+    """Get nested category tree. (GET)"""
+    id: Annotated[int, Field(
+        description="Unique category ID"
+    )]
+
+    name: Annotated[str, Field(
+        description="Category name"
+    )]
+
+    parent_id: Annotated[int | None, Field(
+        default=None,
+        description="Parent category ID"
+    )]
+
+    products_count: Annotated[int | None, Field(
+        default=None,
+        description="Count of active products in this category (if requested)"
+    )]
+
+    children: Annotated[list['CategoryTree'], Field(
+        default_factory=list,
+        description="Active subcategories"
+    )]
+
+
+class SellerStats(BaseModel):
+    """Get seller dashboard aggregates. (GET)"""
+    products_count: Annotated[int, Field(
+        default=0,
+        description="Count of active products"
+    )]
+
+    total_stock: Annotated[int, Field(
+        default=0,
+        description="Total stock of active products"
+    )]
+
+    low_stock_count: Annotated[int, Field(
+        default=0,
+        description="Count of active products with low stock"
+    )]
+
+    reviews_count: Annotated[int, Field(
+        default=0,
+        description="Count of active reviews on seller's products"
+    )]
+
+    average_rating: Annotated[Decimal, Field(
+        default=Decimal('0.00'),
+        ge=0,
+        le=5,
+        decimal_places=2,
+        description="Average grade of active reviews on seller's products"
+    )]
+
+
+class AutocompleteSuggestion(BaseModel):
+    """Get product or category suggestion by name prefix. (GET)"""
+    type: Annotated[Literal['category', 'product'], Field(
+        description="Suggested entity: category or product"
+    )]
+
+    id: Annotated[int, Field(
+        description="Unique category or product ID"
+    )]
+
+    name: Annotated[str, Field(
+        description="Category or product name"
+    )]
+
+    rating: Annotated[float | None, Field(
+        default=None,
+        description="Product rating (suggestions are ordered by it)"
+    )]
+
+
+class ProductImage(BaseModel):
+    """Get urls of uploaded product image. (POST)"""
+    product_id: Annotated[int, Field(
+        description="Unique product ID"
+    )]
+
+    original: Annotated[str, Field(
+        description="Url of original image (saved as product image_url)"
+    )]
+
+    thumbnails: Annotated[dict[int, dict[str, str]], Field(
+        description="Urls of thumbnails by max side in px and format (webp, jpeg)"
+    )]
+
+
+class CategoryFacet(BaseModel):
+    category_id: Annotated[int, Field(
+        description="Direct subcategory ID (counts include its whole subtree)"
+    )]
+
+    count: Annotated[int, Field(
+        description="Count of products"
+    )]
+
+
+class PriceFacet(BaseModel):
+    min_price: Annotated[Decimal, Field(
+        description="Min price of bucket (inclusive)"
+    )]
+
+    max_price: Annotated[Decimal | None, Field(
+        default=None,
+        description="Max price of bucket (exclusive), None for the last bucket"
+    )]
+
+    count: Annotated[int, Field(
+        description="Count of products"
+    )]
+
+
+class RatingFacet(BaseModel):
+    rating: Annotated[int, Field(
+        description="Whole stars of rating: products with rating from this value up to the next one"
+    )]
+
+    count: Annotated[int, Field(
+        description="Count of products"
+    )]
+
+
+class ProductFacets(BaseModel):
+    """Get counts of active in-stock products of category. (GET)"""
+    category_id: Annotated[int | None, Field(
+        default=None,
+        description="Category ID (None for the whole catalog)"
+    )]
+
+    total: Annotated[int, Field(
+        description="Count of products of category with all its subcategories"
+    )]
+
+    subcategories: Annotated[list[CategoryFacet], Field(
+        default_factory=list,
+        description="Counts by direct subcategory (root categories for the whole catalog)"
+    )]
+
+    prices: Annotated[list[PriceFacet], Field(
+        default_factory=list,
+        description="Counts by price bucket"
+    )]
+
+    ratings: Annotated[list[RatingFacet], Field(
+        default_factory=list,
+        description="Counts by whole stars of rating"
+    )]
@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import re
+import time
+from collections import deque
+
+from pydantic_settings import SettingsConfigDict
+from sqlalchemy import event
+
+from app.config import ConfigBase
+from app.database import async_engine
+from app.query_budget import get_current_route
+
+logger = logging.getLogger(__name__)
+
+# execution option of statements the log should skip (its own EXPLAIN)
+SKIP_OPTION = 'skip_slow_query_log'
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\$\d+|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_EXPLAINABLE = re.compile(r'^\s*select\b.*\bfrom\b', re.IGNORECASE | re.DOTALL)
+
+
+class SlowQueryConfig(ConfigBase):
+    THRESHOLD_MS: int = 200
+    EXPLAIN: bool = False  # EXPLAIN ANALYZE runs the first slow SELECT of every fingerprint once more
+    EXPLAIN_TIMEOUT_MS: int = 10_000
+    RECENT_SIZE: int = 100
+    MAX_FINGERPRINTS: int = 1000
+    model_config = SettingsConfigDict(env_prefix='SLOW_QUERY_')
+
+
+slow_query_cfg = SlowQueryConfig()
+
+
+def get_fingerprint(statement: str) -> tuple[str, str]:
+    """Get (digest, normalized statement): literals and parameters as ?, IN lists as (...)"""
+    normalized = _LISTS.sub('(...)', _LITERALS.sub('?', ' '.join(statement.split())))
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest(), normalized
+
+
+def redact_parameters(parameters) -> list | dict | None:
+    """Replace parameter values by their type names"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def is_explainable(statement: str) -> bool:
+    """SELECT reading a table: EXPLAIN ANALYZE has no side effects (not pg_notify or locks)"""
+    return _EXPLAINABLE.match(statement) is not None and 'FOR UPDATE' not in statement.upper()
+
+
+class SlowQueryLog:
+    """Recent slow statements and totals per statement fingerprint"""
+
+    def __init__(self, threshold_ms: int, explain: bool, recent_size: int, max_fingerprints: int):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.max_fingerprints = max_fingerprints
+        self.recent: deque[dict] = deque(maxlen=recent_size)
+        self.fingerprints: dict[str, dict] = {}
+        self.dropped = 0  # slow statements of new fingerprints over max_fingerprints
+        self._explain_tasks: set[asyncio.Task] = set()
+
+    def record(self, statement: str, parameters, duration: float, executemany: bool) -> None:
+        digest, normalized = get_fingerprint(statement)
+        route = get_current_route()
+        duration_ms = round(duration * 1000, 2)
+        self.recent.append({
+            'fingerprint': digest,
+            'route': route,
+            'duration_ms': duration_ms,
+            'parameters': redact_parameters(parameters[0] if executemany and parameters else parameters),
+            'executemany': executemany,
+            'at': time.time(),
+        })
+        logger.warning("Slow query %s (%s ms, route %s): %s", digest, duration_ms, route, normalized)
+
+        stats = self.fingerprints.get(digest)
+        if stats is None:
+            if len(self.fingerprints) >= self.max_fingerprints:
+                self.dropped += 1
+                return
+            stats = self.fingerprints[digest] = {
+                'fingerprint': digest,
+                'statement': normalized,
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'routes': [],
+                'plan': None,
+            }
+            if self.explain and not executemany and is_explainable(statement):
+                self._start_explain(stats, statement, parameters)
+        stats['count'] += 1
+        stats['total_ms'] = round(stats['total_ms'] + duration_ms, 2)
+        stats['max_ms'] = max(stats['max_ms'], duration_ms)
+        if route is not None and route not in stats['routes']:
+            stats['routes'].append(route)
+
+    def stats(self) -> dict:
+        return {
+            'threshold_ms': self.threshold * 1000,
+            'dropped': self.dropped,
+            'fingerprints': sorted(self.fingerprints.values(), key=lambda stats: stats['total_ms'], reverse=True),
+            'recent': list(reversed(self.recent)),
+        }
+
+    def _start_explain(self, stats: dict, statement: str, parameters) -> None:
+        # empty context: explain statements are not counted in the request query budget
+        task = asyncio.get_running_loop().create_task(self._explain(stats, statement, parameters),
+                                                      context=contextvars.Context())
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+
+    async def _explain(self, stats: dict, statement: str, parameters) -> None:
+        """Capture plan with actual times on its own connection, rolled back after"""
+        try:
+            async with async_engine.connect() as connection:
+                connection = await connection.execution_options(**{SKIP_OPTION: True})
+                await connection.exec_driver_sql(
+                    f"select set_config('statement_timeout', '{slow_query_cfg.EXPLAIN_TIMEOUT_MS}', true)")
+                result = await connection.exec_driver_sql(f'EXPLAIN (ANALYZE, BUFFERS) {statement}', parameters)
+                stats['plan'] = '\n'.join(row[0] for row in result)
+                await connection.rollback()
+        except Exception as error:
+            logger.warning("EXPLAIN of slow query %s failed: %s", stats['fingerprint'], error)
+            stats['plan'] = f'EXPLAIN failed: {error}'
+
+
+slow_query_log = SlowQueryLog(slow_query_cfg.THRESHOLD_MS, slow_query_cfg.EXPLAIN,
+                              slow_query_cfg.RECENT_SIZE, slow_query_cfg.MAX_FINGERPRINTS)
+
+
+@event.listens_for(async_engine.sync_engine, 'before_cursor_execute')
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    context.slow_query_started = time.perf_counter()
+
+
+@event.listens_for(async_engine.sync_engine, 'after_cursor_execute')
+def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context.slow_query_started
+    if duration < slow_query_log.threshold or context.execution_options.get(SKIP_OPTION):
+        return
+    slow_query_log.record(statement, parameters, duration, executemany)
@@ -0,0 +1,49 @@
+"""Prebuilt statements of hot lookups.
+
+Built once at import with bound parameters: a call only binds values, while
+SQLAlchemy reuses the statement and its memoized cache key instead of building
+a new construct and traversing it for the compiled cache on every request.
+"""
+from sqlalchemy import select, bindparam, literal_column, Integer
+from sqlalchemy.orm import joinedload
+
+from app.models import Product as ProductModel, Category as CategoryModel, \
+    Review as ReviewModel, User as UserModel, ProductRelated as ProductRelatedModel
+
+active_product_by_id_stmt = select(ProductModel).where(ProductModel.id == bindparam('product_id'),
+                                                       ProductModel.is_active == True)
+visible_product_by_id_stmt = select(ProductModel).where(ProductModel.id == bindparam('product_id'),
+                                                        ProductModel.is_visible == True)
+# literal 0: partial index predicate (stock > 0) is matched by generic plans of prepared statement too
+product_in_stock = ProductModel.stock > literal_column('0')
+
+visible_in_stock_products_stmt = select(ProductModel).where(ProductModel.is_visible == True, product_in_stock)
+visible_category_products_stmt = select(ProductModel).where(ProductModel.category_id == bindparam('category_id'),
+                                                            ProductModel.is_visible == True)
+trending_products_stmt = (select(ProductModel)
+                          .where(ProductModel.is_visible == True)
+                          .order_by(ProductModel.trending_score.desc())
+                          .limit(bindparam('limit', type_=Integer)))
+related_products_stmt = (select(ProductModel)
+                         .join(ProductRelatedModel, ProductRelatedModel.related_product_id == ProductModel.id)
+                         .where(ProductRelatedModel.product_id == bindparam('product_id'),
+                                ProductModel.is_visible == True)
+                         .order_by(ProductRelatedModel.rank))
+
+active_categories_stmt = select(CategoryModel).where(CategoryModel.is_active == True)
+active_category_by_id_stmt = select(CategoryModel).where(CategoryModel.id == bindparam('category_id'),
+                                                         CategoryModel.is_active == True)
+
+active_reviews_stmt = select(ReviewModel).where(ReviewModel.is_active == True)
+active_product_reviews_stmt = select(ReviewModel).where(ReviewModel.is_active == True,
+                                                        ReviewModel.product_id == bindparam('product_id'))
+# product is joined: review delete updates stats of its seller
+active_review_by_id_stmt = (select(ReviewModel)
+                            .options(joinedload(ReviewModel.product, innerjoin=True))
+                            .where(ReviewModel.id == bindparam('review_id'),
+                                   ReviewModel.is_active == True))
+
+active_user_by_id_stmt = select(UserModel).where(UserModel.id == bindparam('user_id'),
+                                                 UserModel.is_active == True)
+active_user_by_email_stmt = select(UserModel).where(UserModel.email == bindparam('email'),
+                                                    UserModel.is_active == True)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import update, bindparam, func, Integer, Float
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.database import async_session_maker
+from app.models import Product as ProductModel
+
+logger = logging.getLogger(__name__)
+
+# at most this much of views is lost on crash
+VIEWS_FLUSH_INTERVAL_SECONDS = 5
+VIEWS_MAX_PENDING_PRODUCTS = 10_000  # flush earlier if reached
+
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_DECAY = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+TRENDING_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def get_views_log_weight(views: int, viewed_at: float) -> float:
+    """Log of views weight at viewed_at (forward decay: older views have smaller weight)"""
+    return TRENDING_DECAY * (viewed_at - TRENDING_EPOCH) + math.log(views)
+
+
+class ViewCounter:
+    """Buffer of product views, flushed to db by one UPDATE for all viewed products"""
+
+    def __init__(self, max_pending: int = VIEWS_MAX_PENDING_PRODUCTS):
+        self.max_pending = max_pending
+        self._pending: dict[int, int] = {}
+        self._flush_requested = asyncio.Event()
+        self.flushed_views = 0
+        self.lost_views = 0
+
+    def record_view(self, product_id: int) -> None:
+        self._pending[product_id] = self._pending.get(product_id, 0) + 1
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        self._flush_requested.clear()
+        now = time.time()
+        # arrays instead of VALUES rows: 3 bind parameters for any count of products
+        views = func.unnest(
+            bindparam('ids', list(pending), type_=ARRAY(Integer)),
+            bindparam('views', list(pending.values()), type_=ARRAY(Integer)),
+            bindparam('log_weights', [get_views_log_weight(count, now) for count in pending.values()],
+                      type_=ARRAY(Float)),
+        ).table_valued('id', 'views', 'log_weight').render_derived(name='views')
+        # trending_score = ln(exp(trending_score) + exp(log_weight)) without float overflow
+        top = func.greatest(ProductModel.trending_score, views.c.log_weight)
+        try:
+            async with async_session_maker() as db:
+                await db.execute(update(ProductModel)
+                                 .where(ProductModel.id == views.c.id)
+                                 .values(views_count=ProductModel.views_count + views.c.views,
+                                         trending_score=top + func.ln(func.exp(ProductModel.trending_score - top)
+                                                                      + func.exp(views.c.log_weight - top)))
+                                 .execution_options(synchronize_session=False)
+                                 )
+                await db.commit()
+        except Exception:
+            logger.exception("Product views flush failed")
+            self._restore(pending)
+            return
+        self.flushed_views += sum(pending.values())
+
+    def _restore(self, pending: dict[int, int]) -> None:
+        """Put back views of failed flush while buffer has room for them"""
+        for product_id, count in pending.items():
+            if product_id in self._pending or len(self._pending) < self.max_pending:
+                self._pending[product_id] = self._pending.get(product_id, 0) + count
+            else:
+                self.lost_views += count
+
+    async def run(self, interval: float = VIEWS_FLUSH_INTERVAL_SECONDS) -> None:
+        """Flush buffer periodically (or when it's full) and on shutdown"""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._flush_requested.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                await self.flush()
+        finally:
+            await self.flush()
+
+
+view_counter = ViewCounter()
@@ -0,0 +1,55 @@
+"""Bytes on the wire and CPU per request of list responses with and without compression.
+
+Run: python -m benchmarks.compression
+"""
+import json
+import random
+import time
+
+from app.compression import compress_body, PrecompressedCache, brotli
+
+PRODUCTS_COUNT = 1000
+REQUESTS = 200
+
+
+def make_products_payload(count: int) -> bytes:
+    """JSON body shaped like GET /products/ response"""
+    rnd = random.Random(42)
+    products = [{
+        'id': i,
+        'name': f'Product {rnd.choice(["phone", "laptop", "chair", "lamp", "book"])} {i}',
+        'description': rnd.choice([None, 'Some description of the product with a few words']),
+        'price': f'{rnd.uniform(1, 1000):.2f}',
+        'image_url': None,
+        'stock': rnd.randint(1, 100),
+        'category_id': rnd.randint(1, 30),
+        'is_active': True,
+        'rating': f'{rnd.uniform(0, 5):.2f}',
+    } for i in range(1, count + 1)]
+    return json.dumps(products, separators=(',', ':')).encode()
+
+
+def measure(name: str, body: bytes, make_response) -> None:
+    started = time.process_time()
+    for _ in range(REQUESTS):
+        response = make_response(body)
+    cpu_us = (time.process_time() - started) / REQUESTS * 1_000_000
+    print(f'{name:<24}{len(response):>12,} B{cpu_us:>14,.0f} us/request')
+
+
+def main() -> None:
+    body = make_products_payload(PRODUCTS_COUNT)
+    print(f'{"mode":<24}{"on the wire":>14}{"CPU":>25}')
+    measure('identity', body, lambda b: b)
+    measure('gzip', body, lambda b: compress_body(b, 'gzip'))
+    cache = PrecompressedCache()
+    measure('gzip precompressed', body, lambda b: cache.get_or_compress(b, 'gzip'))
+    if brotli is not None:
+        measure('br', body, lambda b: compress_body(b, 'br'))
+        measure('br precompressed', body, lambda b: cache.get_or_compress(b, 'br'))
+    else:
+        print('brotli is not installed, br modes skipped')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Python overhead per call of hot lookups: statement built per call vs prebuilt.
+
+Executes the same lookup against in-memory SQLite, so the database part is
+tiny and equal for all modes; the difference is building the construct and
+its compiled-cache key on every call.
+
+Run: python -m benchmarks.statements
+"""
+import os
+import time
+
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite://')
+
+from sqlalchemy import create_engine, select, lambda_stmt
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import Product as ProductModel, User as UserModel
+from app.statements import active_product_by_id_stmt, active_user_by_email_stmt
+
+CALLS = 20_000
+
+
+def measure(name: str, session: Session, execute) -> None:
+    for i in range(100):  # warm up compiled cache
+        execute(session, i)
+    started = time.perf_counter()
+    for i in range(CALLS):
+        execute(session, i)
+    call_us = (time.perf_counter() - started) / CALLS * 1_000_000
+    print(f'{name:<40}{call_us:>10.1f} us/call')
+
+
+def main() -> None:
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        print(f'{"mode":<40}{"time":>17}')
+        measure('product by id: built per call', session, lambda db, i: db.scalars(
+            select(ProductModel).where(ProductModel.id == i, ProductModel.is_active == True)).first())
+        measure('product by id: lambda_stmt', session, lambda db, i: db.scalars(
+            lambda_stmt(lambda: select(ProductModel).where(ProductModel.id == i,
+                                                           ProductModel.is_active == True))).first())
+        measure('product by id: prebuilt', session, lambda db, i: db.scalars(
+            active_product_by_id_stmt, {'product_id': i}).first())
+        measure('user by email: built per call', session, lambda db, i: db.scalars(
+            select(UserModel).where(UserModel.email == f'{i}@example.com', UserModel.is_active == True)).first())
+        measure('user by email: prebuilt', session, lambda db, i: db.scalars(
+            active_user_by_email_stmt, {'email': f'{i}@example.com'}).first())
+
+
+if __name__ == '__main__':
+    main()
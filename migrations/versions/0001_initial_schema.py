@@ -0,0 +1,89 @@
+"""initial schema
+
+Schema of the app before migrations were introduced: an existing database
+is stamped at this revision (alembic stamp 0001) and upgraded from it.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'categories',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('parent_id', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['parent_id'], ['categories.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+    op.create_table(
+        'products',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.String(length=500), nullable=True),
+        sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('image_url', sa.String(length=200), nullable=True),
+        sa.Column('stock', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('seller_id', sa.Integer(), nullable=False),
+        sa.Column('rating', sa.Numeric(precision=3, scale=2), nullable=False),
+        sa.CheckConstraint('stock >= 0', name='check_stock_positive'),
+        sa.CheckConstraint('price >= 0', name='check_price_positive'),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+        sa.ForeignKeyConstraint(['seller_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_products_category_id', 'products', ['category_id'])
+    op.create_index('ix_products_seller_id', 'products', ['seller_id'])
+
+    op.create_table(
+        'reviews',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.String(length=1000), nullable=True),
+        sa.Column('comment_date', sa.DateTime(), nullable=False),
+        sa.Column('grade', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'product_id', name='unique_user_product_review'),
+    )
+    op.create_index('ix_reviews_id', 'reviews', ['id'])
+    op.create_index('ix_reviews_user_id', 'reviews', ['user_id'])
+    op.create_index('ix_reviews_product_id', 'reviews', ['product_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('reviews')
+    op.drop_table('products')
+    op.drop_table('categories')
+    op.drop_table('users')
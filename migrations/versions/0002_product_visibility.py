@@ -0,0 +1,40 @@
+"""denormalized product visibility
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 12:02:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # constant default: no table rewrite, only hidden products are updated below
+    op.add_column('products', sa.Column('is_visible', sa.Boolean(), server_default=sa.text('true'),
+                                        nullable=False))
+    # visible categories: active ones whose ancestors are all active, walked down from the roots
+    # (UNION and start from roots: categories of a parent cycle are never reached and count as hidden)
+    op.execute("""
+        WITH RECURSIVE visible_categories(id) AS (
+            SELECT id FROM categories WHERE parent_id IS NULL AND is_active
+            UNION
+            SELECT categories.id FROM categories
+            JOIN visible_categories ON categories.parent_id = visible_categories.id
+            WHERE categories.is_active
+        )
+        UPDATE products SET is_visible = false
+        WHERE NOT is_active OR category_id NOT IN (SELECT id FROM visible_categories)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'is_visible')
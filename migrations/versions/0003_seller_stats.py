@@ -0,0 +1,38 @@
+"""seller dashboard stats
+
+Rows are filled by the seller stats rebuild that runs at app startup.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 12:04:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'seller_stats',
+        sa.Column('seller_id', sa.Integer(), nullable=False),
+        sa.Column('products_count', sa.Integer(), nullable=False),
+        sa.Column('total_stock', sa.BigInteger(), nullable=False),
+        sa.Column('low_stock_count', sa.Integer(), nullable=False),
+        sa.Column('reviews_count', sa.Integer(), nullable=False),
+        sa.Column('grades_sum', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['seller_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('seller_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('seller_stats')
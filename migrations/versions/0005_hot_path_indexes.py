@@ -0,0 +1,54 @@
+"""hot path indexes
+
+Partial and composite indexes for the queries of app/routers/operations.
+Indexes are built CONCURRENTLY (outside of transaction), so they can be
+applied to a live database without locking writes.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 12:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name, table, columns, partial index condition
+HOT_PATH_INDEXES = (
+    # get_products_from_db() without category
+    ('ix_products_visible_in_stock', 'products', ['id'], 'is_visible AND stock > 0'),
+    # get_products_from_db() by category
+    ('ix_products_visible_category_id', 'products', ['category_id'], 'is_visible'),
+    # get_seller_products_from_db() (with low_stock filter)
+    ('ix_products_active_seller_id_stock', 'products', ['seller_id', 'stock'], 'is_active'),
+    # get_reviews_from_db() by product and update_product_rating()
+    ('ix_reviews_active_product_id', 'reviews', ['product_id'], 'is_active'),
+    # get_reviews_from_db() without product
+    ('ix_reviews_active_id', 'reviews', ['id'], 'is_active'),
+    # get_categories_from_db() and categories tree
+    ('ix_categories_active_id', 'categories', ['id'], 'is_active'),
+    # subcategories lookup of category subtree CTE
+    ('ix_categories_parent_id', 'categories', ['parent_id'], None),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, condition in HOT_PATH_INDEXES:
+            op.create_index(name, table, columns,
+                            postgresql_where=sa.text(condition) if condition else None,
+                            postgresql_concurrently=True,
+                            if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(HOT_PATH_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""product views and trending score
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # constant defaults: no table rewrite
+    op.add_column('products', sa.Column('views_count', sa.BigInteger(), server_default=sa.text('0'),
+                                        nullable=False))
+    op.add_column('products', sa.Column('trending_score', sa.Float(), server_default=sa.text('0'),
+                                        nullable=False))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_visible_trending_score', 'products', [sa.text('trending_score DESC')],
+                        postgresql_where=sa.text('is_visible'),
+                        postgresql_concurrently=True,
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_visible_trending_score', table_name='products',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('products', 'trending_score')
+    op.drop_column('products', 'views_count')
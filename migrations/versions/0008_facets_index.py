@@ -0,0 +1,32 @@
+"""covering index of product facets
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 15:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_visible_in_stock_category_id', 'products', ['category_id'],
+                        postgresql_include=['price', 'rating'],
+                        postgresql_where=sa.text('is_visible AND stock > 0'),
+                        postgresql_concurrently=True,
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_visible_in_stock_category_id', table_name='products',
+                      postgresql_concurrently=True, if_exists=True)
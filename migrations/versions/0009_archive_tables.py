@@ -0,0 +1,82 @@
+"""archive tables of deleted products and reviews
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('deactivated_at', sa.DateTime(), nullable=True))
+    op.add_column('reviews', sa.Column('deactivated_at', sa.DateTime(), nullable=True))
+    # rows deleted before the column existed start their retention now
+    op.execute("UPDATE products SET deactivated_at = now() WHERE NOT is_active")
+    op.execute("UPDATE reviews SET deactivated_at = now() WHERE NOT is_active")
+
+    op.create_table(
+        'products_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.String(length=500), nullable=True),
+        sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('image_url', sa.String(length=200), nullable=True),
+        sa.Column('stock', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('is_visible', sa.Boolean(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('seller_id', sa.Integer(), nullable=False),
+        sa.Column('rating', sa.Numeric(precision=3, scale=2), nullable=False),
+        sa.Column('views_count', sa.BigInteger(), nullable=False),
+        sa.Column('trending_score', sa.Float(), nullable=False),
+        sa.Column('deactivated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'reviews_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.String(length=1000), nullable=True),
+        sa.Column('comment_date', sa.DateTime(), nullable=False),
+        sa.Column('grade', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('deactivated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_reviews_archive_product_id', 'reviews_archive', ['product_id'])
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_inactive_deactivated_at', 'products', ['deactivated_at'],
+                        postgresql_where=sa.text('NOT is_active'),
+                        postgresql_concurrently=True,
+                        if_not_exists=True)
+        op.create_index('ix_reviews_inactive_deactivated_at', 'reviews', ['deactivated_at'],
+                        postgresql_where=sa.text('NOT is_active'),
+                        postgresql_concurrently=True,
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reviews_inactive_deactivated_at', table_name='reviews',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_products_inactive_deactivated_at', table_name='products',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_index('ix_reviews_archive_product_id', table_name='reviews_archive')
+    op.drop_table('reviews_archive')
+    op.drop_table('products_archive')
+    op.drop_column('reviews', 'deactivated_at')
+    op.drop_column('products', 'deactivated_at')
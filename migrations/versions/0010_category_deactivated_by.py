@@ -0,0 +1,27 @@
+"""cascade that deactivated category
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 17:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('categories', sa.Column('deactivated_by_id', sa.Integer(), nullable=True))
+    # cascade of earlier deletes is unknown: every inactive category is activated on its own
+    op.execute("UPDATE categories SET deactivated_by_id = id WHERE NOT is_active")
+
+
+def downgrade() -> None:
+    op.drop_column('categories', 'deactivated_by_id')
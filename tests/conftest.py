@@ -0,0 +1,87 @@
+"""Tests run against a scratch PostgreSQL database given by TEST_DATABASE_URL.
+
+Its public schema is dropped and rebuilt by `alembic upgrade head`, so never
+point it at a database with data you need. Without it tests using the database
+are skipped.
+
+Run: TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost/shop_test python -m pytest
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# settings are read at import of app modules
+os.environ['DATABASE_URL'] = TEST_DATABASE_URL or 'postgresql+asyncpg://localhost/unused'
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-test-secret-key-32')
+os.environ['QUERY_BUDGET_ENFORCE'] = 'true'
+os.environ['IMAGES_STORAGE_DIR'] = tempfile.mkdtemp(prefix='test-images-')
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_DATABASE_URL is None:
+        skip = pytest.mark.skip(reason='TEST_DATABASE_URL of a scratch PostgreSQL database is not set')
+        for item in items:
+            if 'migrated_database' in getattr(item, 'fixturenames', ()):
+                item.add_marker(skip)
+
+
+async def execute_sql(*sql: str) -> None:
+    """Execute statements in one transaction by a connection of its own"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+    try:
+        async with engine.begin() as connection:
+            for statement in sql:
+                await connection.exec_driver_sql(statement)
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def migrated_database() -> str:
+    """Empty test database with all migrations applied"""
+    from alembic import command
+    from alembic.config import Config
+
+    asyncio.run(execute_sql('DROP SCHEMA public CASCADE', 'CREATE SCHEMA public'))
+    command.upgrade(Config(os.path.join(ROOT_DIR, 'alembic.ini')), 'head')
+    return TEST_DATABASE_URL
+
+
+@pytest.fixture(scope='module')
+def client(migrated_database):
+    """Test client of app (with its background jobs) over emptied tables"""
+    from fastapi.testclient import TestClient
+    from app.database import Base
+    from app.main import app
+
+    asyncio.run(execute_sql(f'TRUNCATE {", ".join(Base.metadata.tables)} RESTART IDENTITY CASCADE'))
+    with TestClient(app) as client:  # engine is disposed on app shutdown, the next client runs its own loop
+        yield client
+
+
+@pytest.fixture(scope='module')
+def headers(client) -> dict[str, dict]:
+    """Authorization headers of admin, seller and buyer by role"""
+    from app.auth import hash_password
+
+    asyncio.run(execute_sql(
+        "INSERT INTO users (email, hashed_password, is_active, role) "
+        f"VALUES ('admin@example.com', '{hash_password('password1')}', true, 'admin')"))
+    for role in ('seller', 'buyer'):
+        response = client.post('/users/', json={'email': f'{role}@example.com', 'password': 'password1',
+                                                'role': role})
+        assert response.status_code == 201, response.text
+    headers = {}
+    for role in ('admin', 'seller', 'buyer'):
+        response = client.post('/users/token', data={'username': f'{role}@example.com', 'password': 'password1'})
+        assert response.status_code == 200, response.text
+        headers[role] = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+    return headers
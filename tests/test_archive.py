@@ -0,0 +1,61 @@
+"""Deleted products and reviews archived after retention and restored back with seller stats."""
+from tests.test_query_budgets import archive_deleted_rows, create_product, create_review
+
+
+def get_seller_stats(client, headers) -> dict:
+    response = client.get('/users/me/stats', headers=headers['seller'])
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def rebuild_seller_stats(client) -> None:
+    from app.database import async_session_maker
+    from app.routers.operations.seller_stats_operations import rebuild_seller_stats as rebuild
+
+    async def run_rebuild() -> None:
+        async with async_session_maker() as db:
+            assert await rebuild(db)
+
+    client.portal.call(run_rebuild)
+
+
+def test_product_round_trip_restores_reviews_and_seller_stats(client, headers):
+    product = create_product(client, headers)
+    review = create_review(client, headers, product['id'])
+    stats = get_seller_stats(client, headers)
+
+    assert client.delete(f'/products/{product["id"]}', headers=headers['seller']).status_code == 200
+    archive_deleted_rows(client)
+    assert client.get(f'/products/{product["id"]}').status_code == 404
+    assert get_seller_stats(client, headers)['products_count'] == stats['products_count'] - 1
+    assert get_seller_stats(client, headers)['reviews_count'] == stats['reviews_count'] - 1
+
+    response = client.put(f'/archive/products/{product["id"]}/restore', headers=headers['admin'])
+    assert response.status_code == 200, response.text
+    assert client.get(f'/products/{product["id"]}').status_code == 200
+    assert [row['id'] for row in client.get(f'/products/{product["id"]}/reviews').json()] == [review['id']]
+    assert get_seller_stats(client, headers) == stats
+    rebuild_seller_stats(client)  # deltas of archive and restore match the stats counted from scratch
+    assert get_seller_stats(client, headers) == stats
+
+    response = client.put(f'/archive/products/{product["id"]}/restore', headers=headers['admin'])
+    assert response.status_code == 404
+
+
+def test_review_of_archived_product_is_restored_after_product(client, headers):
+    product = create_product(client, headers)
+    review = create_review(client, headers, product['id'])
+    stats = get_seller_stats(client, headers)
+    assert client.delete(f'/reviews/{review["id"]}', headers=headers['buyer']).status_code == 200
+    assert client.delete(f'/products/{product["id"]}', headers=headers['seller']).status_code == 200
+    archive_deleted_rows(client)
+
+    response = client.put(f'/archive/reviews/{review["id"]}/restore', headers=headers['admin'])
+    assert response.status_code == 409
+
+    # the review was archived on its own, not together with the product
+    assert client.put(f'/archive/products/{product["id"]}/restore', headers=headers['admin']).status_code == 200
+    assert client.get(f'/products/{product["id"]}/reviews').json() == []
+    response = client.put(f'/archive/reviews/{review["id"]}/restore', headers=headers['admin'])
+    assert response.status_code == 200, response.text
+    assert get_seller_stats(client, headers) == stats
@@ -0,0 +1,80 @@
+"""Category delete cascade, activate restoring what the cascade changed and the move cycle check."""
+from tests.test_query_budgets import create_category, create_product
+
+
+def active_category_ids(client) -> set[int]:
+    return {category['id'] for category in client.get('/categories/').json()}
+
+
+def is_visible(client, product: dict) -> bool:
+    status_code = client.get(f'/products/{product["id"]}').status_code
+    assert status_code in (200, 404)
+    return status_code == 200
+
+
+def test_delete_hides_subtree_with_its_products(client, headers):
+    root = create_category(client, headers)
+    child = create_category(client, headers, root['id'])
+    grandchild = create_category(client, headers, child['id'])
+    child_product = create_product(client, headers, child['id'])
+    grandchild_product = create_product(client, headers, grandchild['id'])
+    other_product = create_product(client, headers)
+    assert is_visible(client, child_product) and is_visible(client, grandchild_product)
+
+    assert client.delete(f'/categories/{root["id"]}', headers=headers['admin']).status_code == 200
+
+    assert active_category_ids(client) & {root['id'], child['id'], grandchild['id']} == set()
+    assert not is_visible(client, child_product)
+    assert not is_visible(client, grandchild_product)
+    assert client.get(f'/products/category/{grandchild["id"]}').status_code == 400
+    assert is_visible(client, other_product)
+
+
+def test_activate_restores_only_what_cascade_deactivated(client, headers):
+    root = create_category(client, headers)
+    kept = create_category(client, headers, root['id'])
+    deleted_before = create_category(client, headers, root['id'])
+    kept_product = create_product(client, headers, kept['id'])
+    deleted_before_product = create_product(client, headers, deleted_before['id'])
+    assert client.delete(f'/categories/{deleted_before["id"]}', headers=headers['admin']).status_code == 200
+    assert client.delete(f'/categories/{root["id"]}', headers=headers['admin']).status_code == 200
+
+    response = client.put(f'/categories/{root["id"]}/activate', headers=headers['admin'])
+    assert response.status_code == 200, response.text
+
+    active_ids = active_category_ids(client)
+    assert {root['id'], kept['id']} <= active_ids
+    assert deleted_before['id'] not in active_ids
+    assert is_visible(client, kept_product)
+    assert not is_visible(client, deleted_before_product)
+
+    response = client.put(f'/categories/{deleted_before["id"]}/activate', headers=headers['admin'])
+    assert response.status_code == 200, response.text
+    assert is_visible(client, deleted_before_product)
+
+
+def test_activate_under_inactive_parent_is_rejected(client, headers):
+    root = create_category(client, headers)
+    child = create_category(client, headers, root['id'])
+    client.delete(f'/categories/{root["id"]}', headers=headers['admin'])
+
+    response = client.put(f'/categories/{child["id"]}/activate', headers=headers['admin'])
+    assert response.status_code == 400
+
+
+def test_category_can_not_be_moved_into_own_subtree(client, headers):
+    root = create_category(client, headers)
+    child = create_category(client, headers, root['id'])
+    grandchild = create_category(client, headers, child['id'])
+
+    for parent in (root, child, grandchild):
+        response = client.put(f'/categories/{root["id"]}', json={'name': 'moved', 'parent_id': parent['id']},
+                              headers=headers['admin'])
+        assert response.status_code == 400, parent
+        assert response.json()['detail'] == 'Category can not be moved into its own subtree'
+
+    other = create_category(client, headers)
+    response = client.put(f'/categories/{child["id"]}', json={'name': 'moved', 'parent_id': other['id']},
+                          headers=headers['admin'])
+    assert response.status_code == 200, response.text
+    assert response.json()['parent_id'] == other['id']
@@ -0,0 +1,68 @@
+"""POST with Idempotency-Key runs once: duplicates get its response replayed."""
+import asyncio
+import hashlib
+import json
+
+from app import idempotency
+from tests.conftest import execute_sql
+from tests.test_query_budgets import create_category
+
+
+def post_product(client, headers, product: dict, idempotency_key: str):
+    return client.post('/products/', content=json.dumps(product).encode(),
+                       headers={**headers['seller'], 'Content-Type': 'application/json',
+                                'Idempotency-Key': idempotency_key})
+
+
+def make_product(client, headers) -> dict:
+    return {'name': 'product', 'price': '10.50', 'stock': 3, 'category_id': create_category(client, headers)['id']}
+
+
+def claim(client, headers, product: dict, idempotency_key: str):
+    """Claim key as a request in progress on another worker would"""
+    key = idempotency.get_record_key('POST', '/products/', headers['seller']['Authorization'], idempotency_key)
+    request_hash = hashlib.sha256(json.dumps(product).encode()).hexdigest()
+    assert client.portal.call(idempotency.claim_idempotency_key, key, request_hash) is not None
+    return key
+
+
+def test_duplicate_gets_first_response_replayed(client, headers):
+    product = make_product(client, headers)
+    first = post_product(client, headers, product, 'replay')
+    duplicate = post_product(client, headers, product, 'replay')
+
+    assert first.status_code == duplicate.status_code == 201
+    assert duplicate.json() == first.json()
+    assert duplicate.headers['idempotent-replayed'] == 'true'
+    assert 'idempotent-replayed' not in first.headers
+
+
+def test_key_reused_with_another_body_is_rejected(client, headers):
+    product = make_product(client, headers)
+    assert post_product(client, headers, product, 'mismatch').status_code == 201
+
+    response = post_product(client, headers, {**product, 'name': 'another product'}, 'mismatch')
+    assert response.status_code == 422
+
+
+def test_duplicate_of_request_in_progress_gets_conflict(client, headers, monkeypatch):
+    monkeypatch.setattr(idempotency, 'IN_PROGRESS_WAIT_SECONDS', 0.2)
+    product = make_product(client, headers)
+    claim(client, headers, product, 'in-progress')
+
+    response = post_product(client, headers, product, 'in-progress')
+    assert response.status_code == 409
+    assert response.headers['retry-after'] == '1'
+
+
+def test_expired_lease_of_request_in_progress_is_taken_over(client, headers):
+    product = make_product(client, headers)
+    key = claim(client, headers, product, 'expired')
+    asyncio.run(execute_sql(
+        f"UPDATE idempotency_keys SET expires_at = created_at WHERE key = '{key}'"))
+
+    response = post_product(client, headers, product, 'expired')
+    assert response.status_code == 201
+    record = client.portal.call(idempotency.get_idempotency_record, key)
+    assert record.status_code == 201
+    assert (record.expires_at - record.created_at).total_seconds() > idempotency.IN_PROGRESS_LEASE_SECONDS
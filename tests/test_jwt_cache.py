@@ -0,0 +1,74 @@
+"""JWTDecodeCache serves verified claims until token expiry or rotation of its key (no database needed)."""
+import time
+
+import jwt
+import pytest
+
+from app import jwt_cache as jwt_cache_module
+from app.config import ALGORITHM
+from app.jwt_cache import JWTDecodeCache
+
+CURRENT_KEY, PREVIOUS_KEY = 'current-key-current-key-current-key', 'previous-key-previous-key-previous'
+
+
+def make_token(key: str, key_id: str | None, expires_in: int = 60) -> str:
+    headers = None if key_id is None else {'kid': key_id}
+    return jwt.encode({'sub': 'user@example.com', 'exp': int(time.time()) + expires_in}, key,
+                      algorithm=ALGORITHM, headers=headers)
+
+
+def make_cache() -> JWTDecodeCache:
+    return JWTDecodeCache({'previous': PREVIOUS_KEY, 'current': CURRENT_KEY}, default_key=CURRENT_KEY)
+
+
+def test_token_is_decoded_once_until_it_expires(monkeypatch):
+    cache = make_cache()
+    token = make_token(CURRENT_KEY, 'current')
+    claims = cache.decode(token)
+    assert cache.decode(token) is claims
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # past 'exp' the cached entry is not served, the token is verified again (by jwt clock, not patched)
+    real_time = time.time
+    monkeypatch.setattr(jwt_cache_module.time, 'time', lambda: real_time() + 120)
+    cache.decode(token)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cached_token_of_rotated_out_key_is_rejected():
+    cache = make_cache()
+    token = make_token(PREVIOUS_KEY, 'previous')
+    cache.decode(token)
+    cache.decode(token)
+    assert cache.hits == 1
+
+    del cache.verification_keys['previous']
+    with pytest.raises(jwt.InvalidKeyError):
+        cache.decode(token)
+    assert cache.stats()['size'] == 0
+
+
+def test_cached_token_of_replaced_key_is_rejected():
+    cache = make_cache()
+    token = make_token(CURRENT_KEY, 'current')
+    cache.decode(token)
+
+    cache.verification_keys['current'] = 'replaced-key-replaced-key-replaced'
+    with pytest.raises(jwt.InvalidSignatureError):
+        cache.decode(token)
+
+
+def test_token_without_kid_is_verified_by_current_key():
+    cache = make_cache()
+    assert cache.decode(make_token(CURRENT_KEY, None))['sub'] == 'user@example.com'
+    with pytest.raises(jwt.InvalidSignatureError):
+        cache.decode(make_token(PREVIOUS_KEY, None))
+
+
+def test_token_of_unknown_kid_is_rejected_and_not_cached():
+    cache = make_cache()
+    token = make_token(CURRENT_KEY, 'unknown')
+    for _ in range(2):
+        with pytest.raises(jwt.InvalidKeyError):
+            cache.decode(token)
+    assert (cache.hits, cache.misses, cache.stats()['size']) == (0, 2, 0)
@@ -0,0 +1,138 @@
+"""ConcurrencyLimiter admission, queueing and shedding, upload size checks of its middleware (no database needed)."""
+import asyncio
+
+import pytest
+
+from app.limiter import ConcurrencyLimiter
+
+
+async def start_waiting(limiter: ConcurrencyLimiter, budget: float = 1.0) -> asyncio.Task:
+    """Acquire in a task and let it get queued"""
+    task = asyncio.create_task(limiter.acquire(budget))
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 1
+    return task
+
+
+def test_free_slot_is_granted():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=2, max_queue=1, max_wait=1.0)
+        assert await limiter.acquire(1.0)
+        assert await limiter.acquire(1.0)
+        assert (limiter.active, limiter.admitted) == (2, 2)
+        limiter.release()
+        assert limiter.active == 1
+
+    asyncio.run(scenario())
+
+
+def test_released_slot_is_handed_over_to_first_waiter():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=2, max_wait=1.0)
+        assert await limiter.acquire(1.0)
+        first = await start_waiting(limiter)
+        second = asyncio.create_task(limiter.acquire(1.0))
+        await asyncio.sleep(0)
+
+        limiter.release()
+        assert await first
+        assert not second.done() and limiter.active == 1
+        limiter.release()
+        assert await second
+        limiter.release()
+        assert (limiter.active, limiter.queue_depth, limiter.admitted) == (0, 0, 3)
+
+    asyncio.run(scenario())
+
+
+def test_request_over_queue_is_shed():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=0, max_wait=1.0)
+        assert await limiter.acquire(1.0)
+        assert not await limiter.acquire(1.0)
+        assert (limiter.active, limiter.queue_depth, limiter.shed) == (1, 0, 1)
+
+    asyncio.run(scenario())
+
+
+def test_request_over_wait_budget_is_shed():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=10, max_wait=1.0)
+        limiter.service_time = 10.0
+        assert await limiter.acquire(1.0)
+        assert not await limiter.acquire(1.0)  # expected wait is longer than budget, not queued
+        assert (limiter.queue_depth, limiter.shed) == (0, 1)
+
+    asyncio.run(scenario())
+
+
+def test_timed_out_waiter_leaves_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1, max_wait=1.0)
+        assert await limiter.acquire(1.0)
+        assert not await limiter.acquire(0.01)
+        assert (limiter.active, limiter.queue_depth, limiter.shed) == (1, 0, 1)
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancel_racing_handover_does_not_leak_slot():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1, max_wait=1.0)
+        assert await limiter.acquire(1.0)
+        task = await start_waiting(limiter)
+
+        limiter.release()  # slot is handed over, then request is cancelled before it resumes
+        task.cancel()
+        try:
+            granted = await task  # wait_for may keep the result of a future done on cancellation
+        except asyncio.CancelledError:
+            granted = False  # then the slot must have been released by acquire
+        if granted:
+            limiter.release()
+        assert (limiter.active, limiter.queue_depth) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_waiter_dropped_by_release_is_not_removed_twice():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1, max_wait=1.0)
+        assert await limiter.acquire(1.0)
+        task = await start_waiting(limiter)
+
+        limiter._waiters[0].cancel()  # as wait_for does on timeout, before the waiting task resumes
+        limiter.release()  # pops the cancelled waiter and frees the slot
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert (limiter.active, limiter.queue_depth) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_image_upload_over_content_length_is_rejected_before_parsing(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.images import images_cfg
+    from app.main import app
+
+    monkeypatch.setattr(images_cfg, 'MAX_UPLOAD_BYTES', 1000)
+    monkeypatch.setattr(images_cfg, 'MULTIPART_OVERHEAD_BYTES', 100)
+    response = TestClient(app).post('/products/1/image', content=b'x' * 1101,
+                                    headers={'Content-Type': 'multipart/form-data; boundary=x'})
+    assert response.status_code == 413
+
+
+def test_streamed_image_upload_is_cut_at_max_size(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.images import images_cfg
+    from app.main import app
+
+    monkeypatch.setattr(images_cfg, 'MAX_UPLOAD_BYTES', 1000)
+    monkeypatch.setattr(images_cfg, 'MULTIPART_OVERHEAD_BYTES', 100)
+    part_headers = b'--x\r\nContent-Disposition: form-data; name="image"; filename="a.png"\r\n\r\n'
+    chunks = iter([part_headers] + [b'x' * 500] * 4)  # no Content-Length
+    response = TestClient(app).post('/products/1/image', content=chunks,
+                                    headers={'Content-Type': 'multipart/form-data; boundary=x'})
+    assert response.status_code == 413
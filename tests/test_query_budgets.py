@@ -0,0 +1,213 @@
+"""Every route stays within its ROUTE_QUERY_BUDGETS entry on its most expensive path.
+
+QUERY_BUDGET_ENFORCE is on (see conftest): a request over budget is answered 500,
+the others carry X-Query-Count.
+"""
+import asyncio
+import io
+from collections.abc import Callable
+
+import pytest
+from fastapi.routing import APIRoute
+
+from app.query_budget import ROUTE_QUERY_BUDGETS
+from tests.conftest import execute_sql
+
+
+def create_category(client, headers, parent_id: int | None = None) -> dict:
+    response = client.post('/categories/', json={'name': 'category', 'parent_id': parent_id},
+                           headers=headers['admin'])
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def create_product(client, headers, category_id: int | None = None, name: str = 'product') -> dict:
+    if category_id is None:
+        category_id = create_category(client, headers)['id']
+    response = client.post('/products/', json={'name': name, 'price': '10.50', 'stock': 3,
+                                               'category_id': category_id},
+                           headers=headers['seller'])
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def create_review(client, headers, product_id: int | None = None) -> dict:
+    if product_id is None:
+        product_id = create_product(client, headers)['id']
+    response = client.post('/reviews', json={'product_id': product_id, 'grade': 4, 'comment': 'good'},
+                           headers=headers['buyer'])
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def make_png() -> bytes:
+    from PIL import Image
+
+    image = io.BytesIO()
+    Image.new('RGB', (64, 48), 'red').save(image, 'PNG')
+    return image.getvalue()
+
+
+def archive_deleted_rows(client) -> None:
+    """Make deleted rows older than retention and run one archival pass"""
+    from app.routers.operations.archive_operations import archive_inactive_rows
+
+    asyncio.run(execute_sql(
+        "UPDATE products SET deactivated_at = deactivated_at - interval '1 year' WHERE NOT is_active",
+        "UPDATE reviews SET deactivated_at = deactivated_at - interval '1 year' WHERE NOT is_active"))
+    client.portal.call(archive_inactive_rows)
+
+
+def open_event_stream(client, path: str) -> dict:
+    """Get response start of SSE stream and disconnect (a test client would read it forever)"""
+    async def request() -> dict:
+        started = asyncio.Event()
+        start = {}
+
+        async def receive():
+            await started.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                start.update(message)
+                started.set()
+
+        path_only, _, query = path.partition('?')
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                 'scheme': 'http', 'path': path_only, 'raw_path': path_only.encode(),
+                 'query_string': query.encode(), 'root_path': '', 'headers': [(b'host', b'testserver')],
+                 'client': ('testclient', 50000), 'server': ('testserver', 80)}
+        await client.app(scope, receive, send)
+        return start
+
+    start = client.portal.call(request)
+    headers = {name.decode(): value.decode() for name, value in start['headers']}
+    return {'status_code': start['status'], 'headers': headers}
+
+
+def upload_image(client, headers):
+    product = create_product(client, headers)
+    return client.post(f'/products/{product["id"]}/image', files={'image': ('image.png', make_png(), 'image/png')},
+                       headers=headers['seller'])
+
+
+def activate_category(client, headers):
+    parent_id = create_category(client, headers)['id']  # parent is checked to be active
+    category_id = create_product(client, headers, create_category(client, headers, parent_id)['id'])['category_id']
+    client.delete(f'/categories/{category_id}', headers=headers['admin'])
+    return client.put(f'/categories/{category_id}/activate', headers=headers['admin'])
+
+
+def restore_product(client, headers):
+    product = create_product(client, headers)
+    create_review(client, headers, product['id'])
+    client.delete(f'/products/{product["id"]}', headers=headers['seller'])
+    archive_deleted_rows(client)
+    return client.put(f'/archive/products/{product["id"]}/restore', headers=headers['admin'])
+
+
+def restore_review(client, headers):
+    review = create_review(client, headers)
+    client.delete(f'/reviews/{review["id"]}', headers=headers['buyer'])
+    archive_deleted_rows(client)
+    return client.put(f'/archive/reviews/{review["id"]}/restore', headers=headers['admin'])
+
+
+def login(client, email: str = 'seller@example.com') -> dict:
+    return client.post('/users/token', data={'username': email, 'password': 'password1'}).json()
+
+
+# request of route on its most expensive path (cache misses, all optional checks)
+ROUTE_REQUESTS: dict[tuple[str, str], Callable] = {
+    ('GET', '/categories/'): lambda client, headers: client.get('/categories/'),
+    ('GET', '/categories/tree'): lambda client, headers: client.get('/categories/tree?with_products_count=true'),
+    ('POST', '/categories/'): lambda client, headers: client.post(
+        '/categories/', json={'name': 'child', 'parent_id': create_category(client, headers)['id']},
+        headers=headers['admin']),
+    ('PUT', '/categories/{category_id}'): lambda client, headers: client.put(
+        f'/categories/{create_category(client, headers)["id"]}',
+        json={'name': 'moved', 'parent_id': create_category(client, headers)['id']}, headers=headers['admin']),
+    ('DELETE', '/categories/{category_id}'): lambda client, headers: client.delete(
+        f'/categories/{create_product(client, headers)["category_id"]}', headers=headers['admin']),
+    ('PUT', '/categories/{category_id}/activate'): activate_category,
+    ('GET', '/products/'): lambda client, headers: client.get('/products/'),
+    ('POST', '/products/'): lambda client, headers: client.post(
+        '/products/', json={'name': 'product', 'price': '1.00', 'stock': 1,
+                            'category_id': create_category(client, headers)['id']}, headers=headers['seller']),
+    ('GET', '/products/category/{category_id}'): lambda client, headers: client.get(
+        f'/products/category/{create_product(client, headers)["category_id"]}'),
+    ('GET', '/products/trending'): lambda client, headers: client.get('/products/trending'),
+    ('GET', '/products/autocomplete'): lambda client, headers: client.get('/products/autocomplete?prefix=pro'),
+    ('GET', '/products/events'): lambda client, headers: open_event_stream(client, '/products/events?category_id=1'),
+    ('GET', '/products/facets'): lambda client, headers: client.get(
+        f'/products/facets?category_id={create_product(client, headers)["category_id"]}'),
+    ('GET', '/products/{product_id}'): lambda client, headers: client.get(
+        f'/products/{create_product(client, headers)["id"]}'),
+    ('GET', '/products/{product_id}/related'): lambda client, headers: client.get(
+        f'/products/{create_product(client, headers)["id"]}/related'),
+    ('PUT', '/products/{product_id}'): lambda client, headers: client.put(
+        f'/products/{create_product(client, headers)["id"]}',
+        json={'name': 'updated', 'price': '2.00', 'stock': 7, 'category_id': create_category(client, headers)['id']},
+        headers=headers['seller']),
+    ('DELETE', '/products/{product_id}'): lambda client, headers: client.delete(
+        f'/products/{create_product(client, headers)["id"]}', headers=headers['seller']),
+    ('POST', '/products/{product_id}/image'): upload_image,
+    ('GET', '/reviews'): lambda client, headers: client.get('/reviews'),
+    ('GET', '/products/{product_id}/reviews'): lambda client, headers: client.get(
+        f'/products/{create_review(client, headers)["product_id"]}/reviews'),
+    ('POST', '/reviews'): lambda client, headers: client.post(
+        '/reviews', json={'product_id': create_product(client, headers)['id'], 'grade': 5},
+        headers=headers['buyer']),
+    ('DELETE', '/reviews/{review_id}'): lambda client, headers: client.delete(
+        f'/reviews/{create_review(client, headers)["id"]}', headers=headers['buyer']),
+    ('POST', '/users/'): lambda client, headers: client.post(
+        '/users/', json={'email': 'new@example.com', 'password': 'password1', 'role': 'buyer'}),
+    ('POST', '/users/token'): lambda client, headers: client.post(
+        '/users/token', data={'username': 'seller@example.com', 'password': 'password1'}),
+    ('POST', '/users/access_token'): lambda client, headers: client.post(
+        '/users/access_token', json={'refresh_token': login(client)['refresh_token']}),
+    ('POST', '/users/refresh_token'): lambda client, headers: client.post(
+        '/users/refresh_token', json={'refresh_token': login(client)['refresh_token']}),
+    ('GET', '/users/me/stats'): lambda client, headers: client.get('/users/me/stats', headers=headers['seller']),
+    ('GET', '/users/me/products'): lambda client, headers: client.get('/users/me/products?low_stock=true',
+                                                                      headers=headers['seller']),
+    ('GET', '/users/{user_id}'): lambda client, headers: client.get('/users/2'),
+    ('PUT', '/users/{user_id}/update_role'): lambda client, headers: client.put(
+        '/users/3/update_role', json={'new_role': 'buyer'}, headers=headers['admin']),
+    ('GET', '/'): lambda client, headers: client.get('/'),
+    ('GET', '/images/{digest}/{name}'): lambda client, headers: client.get(
+        upload_image(client, headers).json()['thumbnails']['160']['webp']),
+    ('GET', '/metrics/product_cache'): lambda client, headers: client.get('/metrics/product_cache',
+                                                                          headers=headers['admin']),
+    ('GET', '/metrics/limiter'): lambda client, headers: client.get('/metrics/limiter', headers=headers['admin']),
+    ('GET', '/metrics/autocomplete'): lambda client, headers: client.get('/metrics/autocomplete',
+                                                                         headers=headers['admin']),
+    ('GET', '/metrics/slow_queries'): lambda client, headers: client.get('/metrics/slow_queries',
+                                                                         headers=headers['admin']),
+    ('GET', '/metrics/product_events'): lambda client, headers: client.get('/metrics/product_events',
+                                                                           headers=headers['admin']),
+    ('GET', '/metrics/jwt_cache'): lambda client, headers: client.get('/metrics/jwt_cache', headers=headers['admin']),
+    ('PUT', '/archive/products/{product_id}/restore'): restore_product,
+    ('PUT', '/archive/reviews/{review_id}/restore'): restore_review,
+}
+
+
+def test_every_route_has_budget_and_request():
+    from app.main import app
+
+    routes = {(method, route.path) for route in app.routes if isinstance(route, APIRoute)
+              for method in route.methods}
+    assert routes - set(ROUTE_QUERY_BUDGETS) == set(), 'routes without query budget'
+    assert set(ROUTE_QUERY_BUDGETS) - routes == set(), 'budgets of removed routes'
+    assert set(ROUTE_QUERY_BUDGETS) == set(ROUTE_REQUESTS), 'routes without request in this test'
+
+
+@pytest.mark.parametrize('route_key', list(ROUTE_QUERY_BUDGETS), ids=' '.join)
+def test_route_within_query_budget(client, headers, route_key):
+    response = ROUTE_REQUESTS[route_key](client, headers)
+    status_code = response['status_code'] if isinstance(response, dict) else response.status_code
+    response_headers = response['headers'] if isinstance(response, dict) else response.headers
+
+    assert status_code < 400, getattr(response, 'text', response)
+    assert int(response_headers['x-query-count']) <= ROUTE_QUERY_BUDGETS[route_key]
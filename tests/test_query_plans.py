@@ -0,0 +1,133 @@
+"""Hot statements are served by indexes under default planner settings.
+
+Tables are seeded with realistic row counts and distributions and ANALYZEd,
+so a missing or unmatchable index shows up as a Seq Scan on a large table.
+Full listings (all visible products, all active reviews, whole catalog facets)
+read most of their table and are not checked: a Seq Scan is the right plan there.
+"""
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from tests.conftest import execute_sql
+
+LARGE_TABLES = {'users', 'products', 'reviews', 'product_related'}
+# subcategory 30 of seeded catalog with its 10 leaf categories
+FACETS_SUBTREE_IDS = [30] + [230 + 200 * leaf for leaf in range(10)]
+
+SEED_SQL = (
+    f'TRUNCATE {", ".join(sorted(LARGE_TABLES | {"categories"}))} RESTART IDENTITY CASCADE',
+    """INSERT INTO users (id, email, hashed_password, is_active, role)
+       SELECT n, 'user-' || n || '@example.com', '', n % 50 <> 0,
+              CASE WHEN n <= 200 THEN 'seller' ELSE 'buyer' END
+       FROM generate_series(1, 10000) AS n""",
+    # 20 roots, 200 subcategories, 2000 leaf categories
+    """INSERT INTO categories (id, name, parent_id, is_active)
+       SELECT n, 'category ' || n,
+              CASE WHEN n > 220 THEN (n - 221) % 200 + 21 WHEN n > 20 THEN (n - 21) % 20 + 1 END,
+              n % 37 <> 0
+       FROM generate_series(1, 2220) AS n""",
+    """INSERT INTO products (id, name, price, stock, is_active, category_id, seller_id, rating, trending_score)
+       SELECT n, 'product ' || n, n % 1000 + 1, CASE WHEN n % 10 = 0 THEN 0 ELSE n % 50 + 1 END,
+              n % 20 <> 0, n % 2000 + 221, n % 200 + 1, (n % 500) / 100.0, (n * 7919) % 10007 / 100.0
+       FROM generate_series(1, 100000) AS n""",
+    """WITH RECURSIVE visible_categories(id) AS (
+           SELECT id FROM categories WHERE parent_id IS NULL AND is_active
+           UNION
+           SELECT categories.id FROM categories
+           JOIN visible_categories ON categories.parent_id = visible_categories.id
+           WHERE categories.is_active
+       )
+       UPDATE products SET is_visible = false
+       WHERE NOT is_active OR category_id NOT IN (SELECT id FROM visible_categories)""",
+    """INSERT INTO reviews (id, user_id, product_id, comment_date, grade, is_active)
+       SELECT n, n % 9800 + 201, (n * 31) % 100000 + 1, now(), n % 5 + 1, n % 20 <> 0
+       FROM generate_series(1, 300000) AS n""",
+    """INSERT INTO product_related (product_id, rank, related_product_id, score)
+       SELECT product_id, rank, (product_id * 13 + rank * 101) % 100000 + 1, 1.0 / rank
+       FROM generate_series(1, 20000) AS product_id, generate_series(1, 10) AS rank""",
+    'ANALYZE users, categories, products, reviews, product_related',
+)
+
+
+def get_hot_statements() -> dict:
+    """Selective hot statements of operations modules with sample parameters and indexes expected in plan"""
+    from app import statements
+    from app.models import Product as ProductModel, Review as ReviewModel
+    from app.routers.operations.categories_operations import get_category_subtree_ids
+    from app.routers.operations.facets_operations import get_facets_stmt, get_facets_subtree_stmt
+    from app.routers.operations.seller_stats_operations import LOW_STOCK_THRESHOLD
+
+    return {
+        'get_products_from_db(category_id)': (statements.visible_category_products_stmt.params(category_id=500),
+                                              {'ix_products_visible_category_id'}),
+        'get_trending_products_from_db': (statements.trending_products_stmt.params(limit=20),
+                                          {'ix_products_visible_trending_score'}),
+        'get_product_by_id': (statements.active_product_by_id_stmt.params(product_id=42), {'products_pkey'}),
+        'get_visible_product_by_id': (statements.visible_product_by_id_stmt.params(product_id=42),
+                                      {'products_pkey'}),
+        'get_related_products_from_db': (statements.related_products_stmt.params(product_id=42),
+                                         {'product_related_pkey'}),
+        'get_seller_products_from_db(low_stock)': (
+            select(ProductModel).where(ProductModel.seller_id == 7, ProductModel.is_active == True,
+                                       ProductModel.stock <= LOW_STOCK_THRESHOLD),
+            {'ix_products_active_seller_id_stock'}),
+        'check_category_by_id': (statements.active_category_by_id_stmt.params(category_id=5),
+                                 {'categories_pkey', 'ix_categories_active_id'}),
+        # categories is a small table: only its seed row is checked to be read by key
+        'get_category_subtree_ids': (get_category_subtree_ids(30), {'categories_pkey', 'ix_categories_active_id'}),
+        'get_facets_json(category_id) subtree': (get_facets_subtree_stmt(30),
+                                                 {'categories_pkey', 'ix_categories_active_id'}),
+        'get_facets_json(category_id)': (get_facets_stmt(FACETS_SUBTREE_IDS, FACETS_SUBTREE_IDS),
+                                         {'ix_products_visible_in_stock_category_id'}),
+        'get_reviews_from_db(product_id)': (statements.active_product_reviews_stmt.params(product_id=42),
+                                            {'ix_reviews_active_product_id'}),
+        'get_review_by_id': (statements.active_review_by_id_stmt.params(review_id=42),
+                             {'reviews_pkey', 'ix_reviews_active_id', 'ix_reviews_id'}),
+        'update_product_rating': (select(func.avg(ReviewModel.grade)).where(ReviewModel.product_id == 42,
+                                                                            ReviewModel.is_active == True),
+                                  {'ix_reviews_active_product_id'}),
+        'get_user_by_id': (statements.active_user_by_id_stmt.params(user_id=5), {'users_pkey'}),
+        'get_user_by_email': (statements.active_user_by_email_stmt.params(email='user-5@example.com'),
+                              {'ix_users_email'}),
+    }
+
+
+def walk_plan(plan: dict):
+    yield plan
+    for subplan in plan.get('Plans', ()):
+        yield from walk_plan(subplan)
+
+
+@pytest.fixture(scope='module')
+def seeded_database(migrated_database):
+    asyncio.run(execute_sql(*SEED_SQL))
+    yield migrated_database
+    asyncio.run(execute_sql('TRUNCATE users, categories, products, reviews, product_related CASCADE'))
+
+
+async def explain(database_url: str, statement) -> dict:
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    try:
+        async with engine.connect() as connection:
+            sql = str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+            plan_json = (await connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql)).scalar()
+    finally:
+        await engine.dispose()
+    return (json.loads(plan_json) if isinstance(plan_json, str) else plan_json)[0]['Plan']
+
+
+@pytest.mark.parametrize('name', list(get_hot_statements()))
+def test_hot_statement_uses_index(seeded_database, name):
+    statement, expected_indexes = get_hot_statements()[name]
+    nodes = list(walk_plan(asyncio.run(explain(seeded_database, statement))))
+
+    seq_scans = {node.get('Relation Name') for node in nodes if node['Node Type'] == 'Seq Scan'}
+    assert not seq_scans & LARGE_TABLES, f'{name}: Seq Scan on {seq_scans & LARGE_TABLES}'
+    used_indexes = {node['Index Name'] for node in nodes if 'Index Name' in node}
+    assert used_indexes & expected_indexes, f'{name}: uses {used_indexes or "no indexes"}, expected {expected_indexes}'